@@ -10,6 +10,7 @@ setup(
     version='0.0.1',
     packages=find_packages('src'),
     package_dir={'': 'src'},
+    python_requires='>=3.4',
     setup_requires=[
         'setuptools >= 18.0'
     ],
@@ -24,4 +25,10 @@ setup(
     scripts=[
         "src/thermal/main.py",
     ],
+    entry_points={
+        'console_scripts': [
+            'thermal-run = thermal.run:main',
+            'thermal-sweep = thermal.sweep:main',
+        ],
+    },
 )
@@ -0,0 +1,4 @@
+#
+# Copyright (c) 2015, Nikolay Polyarnyi
+# All rights reserved.
+#
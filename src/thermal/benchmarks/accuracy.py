@@ -0,0 +1,188 @@
+#
+# Copyright (c) 2015, Nikolay Polyarnyi
+# All rights reserved.
+#
+
+import json
+import time
+import argparse
+import numpy as np
+
+from thermal.benchmarks.processor import list_methods
+from thermal.simulation.stability import UnstableMethodError
+from thermal.simulation.processor import SimulationProcessor
+
+# Translating and spreading Gaussian on [0, length] solves T_t + u T_x = chi T_xx until it reaches the borders
+# (they are kept constant by all methods), see gaussian()
+DEFAULT_PROBLEM = dict(length=1.0, x0=0.3, sigma=0.05, u=0.2, chi=0.001, time=1.0)
+# Refinement ladder: level k has n0 * 2^k intervals and time step dt0 * 2^(-k * dt_power),
+# dt_power=2 keeps r = chi * dt / dx^2 constant, so explicit schemes stay stable on every level
+DEFAULT_N0 = 50
+DEFAULT_DT0 = 0.05
+DEFAULT_LEVELS = 4
+DEFAULT_DT_POWER = 2
+NORMS = ['error_max', 'error_l2', 'error_l1']
+
+
+def gaussian(xs, t, *, x0, sigma, u, chi, **_):
+    """
+    >>> float(gaussian(np.float64([0.3]), 0.0, x0=0.3, sigma=0.05, u=0.2, chi=0.001)[0])
+    1.0
+    """
+    variance = sigma ** 2 + 2 * chi * t
+    return sigma / np.sqrt(variance) * np.exp(-(xs - x0 - u * t) ** 2 / (2 * variance))
+
+
+def list_solvers(processor):
+    # Methods of the advection-diffusion equation (test methods solve other equations)
+    return [method_name for method_name in list_methods(processor) if not method_name.startswith('test_')]
+
+
+def measure(processor, method_name, problem, n, dt):
+    # Runs method on n intervals up to problem['time'], returns errors and wall time
+    dx = problem['length'] / n
+    xs = np.arange(n + 1) * dx
+    steps = max(1, int(round(problem['time'] / dt)))
+    ts = gaussian(xs, 0.0, **problem)
+    result = dict(method=method_name, n=n, dx=dx, dt=dt, steps=steps, cells_steps=(n + 1) * steps,
+                  s=problem['u'] * dt / dx, r=problem['chi'] * dt / dx ** 2)
+
+    start = time.time()
+    try:
+        with processor.open_session(ts, dx=dx, dt=dt, u=problem['u'], chi=problem['chi'],
+                                    method_name=method_name) as session:
+            session.step(steps)
+            session.finish()
+            ts = session.get()
+    except UnstableMethodError as e:
+        # Processor rejects these parameters, other errors (i.e. of kernels build) are not results
+        result.update(stable=False, time_s=float('nan'), reason=str(e), **{norm: float('inf') for norm in NORMS})
+        return result
+    result['time_s'] = time.time() - start
+
+    errors = np.abs(np.float64(ts) - gaussian(xs, steps * dt, **problem))
+    result.update(stable=bool(np.all(np.isfinite(errors))), error_max=float(errors.max()),
+                  error_l2=float(np.sqrt(np.mean(errors ** 2))), error_l1=float(np.mean(errors)))
+    return result
+
+
+def observed_order(dxs, errors):
+    """
+    Slope of log(error) by log(dx), fitted by least squares.
+    >>> round(observed_order([0.1, 0.05, 0.025], [1e-2, 2.5e-3, 6.25e-4]), 6)
+    2.0
+    """
+    return float(np.polyfit(np.log(dxs), np.log(errors), 1)[0])
+
+
+def run_benchmark(method_names=None, *, problem=None, n0=DEFAULT_N0, dt0=DEFAULT_DT0, levels=DEFAULT_LEVELS,
+                  dt_power=DEFAULT_DT_POWER, precision='fp64', norm='error_l2', log=None):
+    """
+    Runs each method on the refinement ladder. Each result also has 'order' - observed convergence order
+    in `norm` between the level and the previous one (None on the first level or after unstable one).
+    Returns results and fitted order of each method over its stable levels.
+    """
+    problem = dict(DEFAULT_PROBLEM, **(problem or {}))
+    processor = SimulationProcessor(precision=precision, stability_mode='reject')
+    method_names = method_names or list_solvers(processor)
+
+    results, orders = [], {}
+    for method_name in method_names:
+        processor.prepare(method_name)
+        method_results = []
+        for level in range(levels):
+            result = measure(processor, method_name, problem, n0 * 2 ** level, dt0 * 2.0 ** (-level * dt_power))
+            result.update(level=level, order=None)
+            previous = method_results[-1] if len(method_results) > 0 else None
+            if previous is not None and previous['stable'] and result['stable'] and result[norm] > 0:
+                result['order'] = observed_order([previous['dx'], result['dx']], [previous[norm], result[norm]])
+            method_results.append(result)
+            if log is not None:
+                log(format_result(result, norm))
+
+        stable = [result for result in method_results if result['stable'] and result[norm] > 0]
+        orders[method_name] = None
+        if len(stable) > 1:
+            orders[method_name] = observed_order([result['dx'] for result in stable],
+                                                 [result[norm] for result in stable])
+        results.extend(method_results)
+    return results, orders
+
+
+def pareto_frontier(results, cost='time_s', norm='error_l2'):
+    """
+    Results not dominated by others (nothing is both cheaper and more accurate), from the cheapest one.
+    >>> results = [dict(id=1, time_s=1, error_l2=0.1), dict(id=2, time_s=2, error_l2=0.2),
+    ...            dict(id=3, time_s=3, error_l2=0.01)]
+    >>> [result['id'] for result in pareto_frontier(results)]
+    [1, 3]
+    """
+    frontier = []
+    for result in sorted(results, key=lambda result: (result[cost], result[norm])):
+        if not (np.isfinite(result[cost]) and np.isfinite(result[norm])):
+            continue
+        if len(frontier) == 0 or result[norm] < frontier[-1][norm]:
+            frontier.append(result)
+    return frontier
+
+
+def cheapest(results, target_error, cost='time_s', norm='error_l2'):
+    # The cheapest result with error not above target_error or None
+    for result in pareto_frontier(results, cost, norm):
+        if result[norm] <= target_error:
+            return result
+    return None
+
+
+def format_result(result, norm='error_l2'):
+    if not result['stable']:
+        return '{method:<32} n={n:<6} dt={dt:<10.3e} s={s:<7.3f} r={r:<7.3f} unstable'.format(**result)
+    order = '' if result['order'] is None else 'order={:.2f}'.format(result['order'])
+    return '{method:<32} n={n:<6} dt={dt:<10.3e} s={s:<7.3f} r={r:<7.3f} time={time_s:8.4f}s ' \
+           'max={error_max:9.3e} l2={error_l2:9.3e} l1={error_l1:9.3e} {order}'.format(**dict(result, order=order))
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description='Benchmarks accuracy of methods against analytic solution '
+                                                 '(translating and spreading Gaussian) versus their cost.')
+    parser.add_argument('--methods', nargs='+', help='names as in get_method_names(), optionally with @backend '
+                                                     '(default: every method with every backend)')
+    parser.add_argument('--n0', type=int, default=DEFAULT_N0, help='intervals on the coarsest level')
+    parser.add_argument('--dt0', type=float, default=DEFAULT_DT0, help='time step on the coarsest level')
+    parser.add_argument('--levels', type=int, default=DEFAULT_LEVELS, help='number of refinements')
+    parser.add_argument('--dt-power', dest='dt_power', type=float, default=DEFAULT_DT_POWER,
+                        help='dt is refined as dx^dt_power (2 - constant r, 1 - constant s)')
+    for name, value in DEFAULT_PROBLEM.items():
+        parser.add_argument('--{}'.format(name), type=float, default=value)
+    parser.add_argument('--precision', choices=['fp32', 'fp64', 'fp16'], default='fp64')
+    parser.add_argument('--norm', choices=NORMS, default='error_l2')
+    parser.add_argument('--cost', choices=['time_s', 'cells_steps'], default='time_s')
+    parser.add_argument('--target', type=float, help='error to find the cheapest method and resolution for')
+    parser.add_argument('--output', help='path to write results as JSON')
+    args = parser.parse_args(args)
+
+    problem = {name: getattr(args, name) for name in DEFAULT_PROBLEM}
+    results, orders = run_benchmark(args.methods, problem=problem, n0=args.n0, dt0=args.dt0, levels=args.levels,
+                                    dt_power=args.dt_power, precision=args.precision, norm=args.norm, log=print)
+
+    print('Observed convergence order ({}):'.format(args.norm))
+    for method_name, order in orders.items():
+        print('{:<32} {}'.format(method_name, 'unstable' if order is None else '{:.2f}'.format(order)))
+    frontier = pareto_frontier(results, args.cost, args.norm)
+    print('Pareto frontier of {} versus {}:'.format(args.norm, args.cost))
+    for result in frontier:
+        print(format_result(result, args.norm))
+    if args.target is not None:
+        best = cheapest(results, args.target, args.cost, args.norm)
+        print('Cheapest with {} <= {}: {}'.format(args.norm, args.target,
+                                                  'none' if best is None else format_result(best, args.norm)))
+
+    if args.output:
+        report = dict(problem=problem, precision=args.precision, results=results, orders=orders,
+                      frontier=[(result['method'], result['n'], result['dt']) for result in frontier])
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,124 @@
+#
+# Copyright (c) 2015, Nikolay Polyarnyi
+# All rights reserved.
+#
+
+import sys
+import json
+import time
+import argparse
+import platform
+import numpy as np
+
+from thermal.simulation.processor import SimulationProcessor
+
+DEFAULT_SIZES = [10 ** k for k in range(2, 9)]
+DEFAULT_ITERS = [1, 10, 100]
+
+
+def list_methods(processor):
+    return ['{}@{}'.format(name, backend) for name in processor.get_method_names()
+            for backend in processor.get_backend_names(name)]
+
+
+def measure(processor, method_name, n, iters, repeats=3):
+    np.random.seed(239)
+    ts = np.float32(np.random.rand(n))
+    params = dict(dx=1.0, dt=1.0, u=0.05, chi=0.1)
+
+    best = None
+    for i in range(repeats):
+        start = time.time()
+        session = processor.open_session(ts, iters=iters, method_name=method_name, **params)
+        session.finish()
+        uploaded = time.time()
+        session.step()
+        session.finish()
+        computed = time.time()
+        session.get()
+        downloaded = time.time()
+        session.close()
+
+        timings = dict(upload_s=uploaded - start, compute_s=computed - uploaded, download_s=downloaded - computed)
+        if best is None or timings['compute_s'] < best['compute_s']:
+            best = timings
+
+    compute_s = max(best['compute_s'], 1e-9)
+    # Effective bandwidth counts only one read and one write of the state per step
+    best['cells_steps_per_s'] = n * iters / compute_s
+    best['gb_per_s'] = 2 * ts.itemsize * n * iters / compute_s / 1e9
+    return best
+
+
+def run_benchmark(method_names=None, sizes=DEFAULT_SIZES, iters_list=DEFAULT_ITERS, repeats=3, log=None):
+    processor = SimulationProcessor()
+    method_names = method_names or list_methods(processor)
+
+    results = []
+    for method_name in method_names:
+        start = time.time()
+        processor.prepare(method_name)
+        compile_s = time.time() - start
+        for n in sizes:
+            for iters in iters_list:
+                result = dict(method=method_name, n=n, iters=iters, compile_s=compile_s)
+                result.update(measure(processor, method_name, n, iters, repeats))
+                results.append(result)
+                if log is not None:
+                    log(format_result(result))
+    return results
+
+
+def format_result(result):
+    return '{method:<32} n={n:<10} iters={iters:<5} compile={compile_s:7.3f}s upload={upload_s:7.4f}s ' \
+           'compute={compute_s:8.4f}s download={download_s:7.4f}s {cells_steps_per_s:10.3e} cells*steps/s ' \
+           '{gb_per_s:7.2f} GB/s'.format(**result)
+
+
+def _result_key(result):
+    return result['method'], result['n'], result['iters']
+
+
+def compare_with_baseline(results, baseline_results, tolerance=0.1):
+    # Returns (result, baseline result) pairs where throughput dropped more than by tolerance
+    baseline = {_result_key(result): result for result in baseline_results}
+    regressions = []
+    for result in results:
+        base = baseline.get(_result_key(result))
+        if base is not None and result['cells_steps_per_s'] < (1 - tolerance) * base['cells_steps_per_s']:
+            regressions.append((result, base))
+    return regressions
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description='Benchmarks SimulationProcessor methods over sizes and steps.')
+    parser.add_argument('--methods', nargs='+', help='names as in get_method_names(), optionally with @backend '
+                                                     '(default: every method with every backend)')
+    parser.add_argument('--sizes', nargs='+', type=int, default=DEFAULT_SIZES)
+    parser.add_argument('--iters', nargs='+', type=int, default=DEFAULT_ITERS)
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--output', help='path to write results as JSON')
+    parser.add_argument('--baseline', help='path to JSON results of previous run to compare with')
+    parser.add_argument('--tolerance', type=float, default=0.1, help='allowed relative throughput drop')
+    args = parser.parse_args(args)
+
+    results = run_benchmark(args.methods, args.sizes, args.iters, args.repeats, log=print)
+
+    if args.output:
+        report = dict(python=sys.version, platform=platform.platform(), numpy=np.__version__, results=results)
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline_results = json.load(f)['results']
+        regressions = compare_with_baseline(results, baseline_results, args.tolerance)
+        for result, base in regressions:
+            print('REGRESSION {} n={} iters={}: {:.3e} -> {:.3e} cells*steps/s'.format(
+                result['method'], result['n'], result['iters'], base['cells_steps_per_s'], result['cells_steps_per_s']))
+        if len(regressions) > 0:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+#
+# Copyright (c) 2015, Nikolay Polyarnyi
+# All rights reserved.
+#
+
+import sys
+import json
+import argparse
+import tempfile
+import subprocess
+
+# Each scenario runs in a fresh interpreter, so imports, context creation and compilation are measured cold
+_SCENARIO_CODE = '''
+import json
+import time
+start = time.time()
+import numpy as np
+from thermal.simulation.processor import SimulationProcessor
+processor = SimulationProcessor(kernels_cache_dir={cache_dir!r})
+imported = time.time()
+processor.get_method_names()
+listed = time.time()
+if {eager!r}:
+    processor.compile()
+processor.process(np.zeros(239, np.float32), dx=1.0, dt=1.0, u=0.1, chi=0.1, method_name={method_name!r})
+done = time.time()
+print(json.dumps(dict(import_time=imported - start, names_time=listed - imported, first_result_time=done - listed)))
+'''
+
+
+def run_scenario(method_name, cache_dir, eager):
+    code = _SCENARIO_CODE.format(method_name=method_name, cache_dir=cache_dir, eager=eager)
+    output = subprocess.check_output([sys.executable, '-c', code], universal_newlines=True)
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def run_benchmark(method_name='explicit_central', repeats=3):
+    results = []
+    for i in range(repeats):
+        with tempfile.TemporaryDirectory(prefix='thermal_kernels_') as cache_dir:
+            scenarios = [('eager compile, no binary cache', False, True),
+                         ('lazy compile, no binary cache', False, False),
+                         ('lazy compile, cold binary cache', cache_dir, False),
+                         ('lazy compile, warm binary cache', cache_dir, False)]
+            for name, scenario_cache_dir, eager in scenarios:
+                timings = run_scenario(method_name, scenario_cache_dir, eager)
+                timings['scenario'] = name
+                results.append(timings)
+    return results
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description='Measures startup of SimulationProcessor until the first result.')
+    parser.add_argument('--method', default='explicit_central')
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--json', action='store_true', help='print raw measurements as JSON')
+    args = parser.parse_args(args)
+
+    results = run_benchmark(args.method, args.repeats)
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print('{:<34} {:>10} {:>10} {:>14} {:>10}'.format('scenario (best of {})'.format(args.repeats),
+                                                     'import, s', 'names, s', 'first run, s', 'total, s'))
+    scenarios = []
+    for result in results:
+        if result['scenario'] not in scenarios:
+            scenarios.append(result['scenario'])
+
+    for scenario in scenarios:
+        best = min((result for result in results if result['scenario'] == scenario),
+                   key=lambda result: result['import_time'] + result['names_time'] + result['first_result_time'])
+        print('{:<34} {:>10.3f} {:>10.3f} {:>14.3f} {:>10.3f}'.format(
+            scenario, best['import_time'], best['names_time'], best['first_result_time'],
+            best['import_time'] + best['names_time'] + best['first_result_time']))
+
+
+if __name__ == '__main__':
+    main()
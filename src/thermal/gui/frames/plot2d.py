@@ -8,7 +8,6 @@ import logging
 import numpy as np
 
 from thermal.utils import gl
-from thermal.utils import support
 from thermal.gui.frames.frame2d import Frame2D
 
 logger = logging.getLogger(__name__)
@@ -28,9 +27,13 @@ class Plot2D(Frame2D):
         ''':type: thermal.utils.gl.Shader'''
 
         self._ys = None
+        self._ys_given_range = None
 
         self._used_ys = None
+        self._ys_uploaded = False
         self._ys_texture = None
+        ''':type: thermal.utils.gl.StreamingTexture2D'''
+        self._max_texture_size = None
         self._ys_values_range = None
         self._y_axis_range = None
 
@@ -39,6 +42,7 @@ class Plot2D(Frame2D):
         yield from super(Plot2D, self).init()
         _, self._heat_map_texture = yield from self._gl_executor.map(self._textures_factory.create_texture, 'heatmap')
         self._plotting_shader = yield from self._gl_executor.map(self._shaders_factory.create_shader, 'plotting')
+        self._max_texture_size = yield from self._gl_executor.map(gl.get_max_texture_size)
 
     @asyncio.coroutine
     def release(self):
@@ -49,8 +53,11 @@ class Plot2D(Frame2D):
             yield from self._gl_executor.map(self._ys_texture.release)
             self._ys_texture = None
 
-    def set_ys(self, ys):
-        self._ys = np.float32(ys)
+    def set_ys(self, ys, values_range=None):
+        # values_range - (min, max) of ys if already known (i.e. from SimulationSession.get_stats()),
+        # otherwise ys are scanned on host
+        self._ys = np.ascontiguousarray(ys, np.float32)
+        self._ys_given_range = values_range
         self.update()
 
     def set_ys_range(self, min_y, max_y):
@@ -67,32 +74,43 @@ class Plot2D(Frame2D):
                 return self._ys_values_range
         return 0., 1.
 
-    def _create_ys_texture(self):
-        assert self._ys is not None
-        # noinspection PyTypeChecker
-        n = len(self._ys)
-        texture = gl.Texture1D()
-        with texture:
-            texture.set_params(gl.LINEAR_LINEAR + gl.CLAMP_TO_EDGE + gl.NO_MIPMAPING + [(gl.GL_TEXTURE_BORDER_COLOR, [0.0, 0.0, 0.0, 0.0])])
-            with gl.configure_pixel_store([(gl.GL_UNPACK_ALIGNMENT, 1)]):
-                gl.glTexImage1D(texture.target, 0, gl.GL_R32F, n, 0, gl.GL_RED, gl.GL_FLOAT, self._ys)
-        self._ys_texture = texture
+    def _get_ys_layout(self, n):
+        # ys are stored in rows of 2-D texture, so that plots longer than maximal texture size can be shown
+        width = min(n, self._max_texture_size)
+        height = (n + width - 1) // width
+        if height > self._max_texture_size:
+            raise Exception('Too many values to plot: {}!'.format(n))
+        return width, height
+
+    def _upload_ys(self, ys):
+        # Texture is allocated only when number of values changes, otherwise it is updated in place
+        size = self._get_ys_layout(len(ys))
+        if self._ys_texture is not None and self._ys_texture.size != size:
+            self._ys_texture.release()
+            self._ys_texture = None
+        if self._ys_texture is None:
+            self._ys_texture = gl.StreamingTexture2D(*size, params=gl.NEAREST_NEAREST + gl.CLAMP_TO_EDGE
+                                                     + gl.NO_MIPMAPING)
+        self._ys_texture.update(ys)
 
     @asyncio.coroutine
     def prepare_for_render(self):
         super().prepare_for_render()
         if self._used_ys is not self._ys:
             self._used_ys = self._ys
-            self._ys_values_range = self._ys.min(), self._ys.max()
-            if self._ys_texture is not None:
-                support.wrap_exc(asyncio.ensure_future(self._gl_executor.map(self._ys_texture.release)), logger)
-            self._ys_texture = None
+            if self._ys_given_range is not None:
+                self._ys_values_range = self._ys_given_range
+            else:
+                self._ys_values_range = self._ys.min(), self._ys.max()
+            self._ys_uploaded = False
 
     def _render_scene(self):
-        if self._ys is None:
+        ys = self._used_ys
+        if ys is None:
             return
-        if self._ys_texture is None:
-            self._create_ys_texture()
+        if not self._ys_uploaded:
+            self._upload_ys(ys)
+            self._ys_uploaded = True
 
         y_min, y_max = self._get_y_range()
         y_range = y_max - y_min
@@ -106,7 +124,9 @@ class Plot2D(Frame2D):
             self._plotting_shader.uniform_matrix_f('to_world_mtx', to_world_mtx)
             self._plotting_shader.uniform_f('y_range', (y_min, y_max))
             self._plotting_shader.uniform_f('line_width', 40.0 / self._height)
-            self._plotting_shader.bind_textures(ys_tex=self._ys_texture, colormap_tex=self._heat_map_texture)
+            self._plotting_shader.uniform_i('ys_n', len(ys))
+            self._plotting_shader.uniform_i('ys_width', self._ys_texture.size[0])
+            self._plotting_shader.bind_textures(ys_tex=self._ys_texture.texture, colormap_tex=self._heat_map_texture)
 
             screen_position = np.array([[-1.0, -1.0], [1.0, -1.0], [-1.0, 1.0], [1.0, 1.0]], np.float32)
             screen_position = np.hstack([screen_position, np.array([[0.0]] * 4), np.array([[1.0]] * 4)])
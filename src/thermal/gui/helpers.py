@@ -5,6 +5,7 @@
 
 import time
 import asyncio
+import collections
 
 
 class FPSLimiter:
@@ -56,3 +57,64 @@ class FPSLimiter:
 
     def stop(self):
         self._frame_changed.cancel()
+
+
+class FramesQueue:
+    """
+    Bounded queue of frames between producer that runs ahead (i.e. simulation) and consumer that only needs
+    the newest frame (i.e. rendering). Consumer takes the newest frame and drops older ones.
+    If the queue is full, producer either waits for consumer (drop='wait') or the oldest frame is dropped
+    (drop='oldest', producer never waits).
+    """
+
+    DROP_POLICIES = ['wait', 'oldest']
+
+    def __init__(self, maxsize=2, drop='wait'):
+        if drop not in self.DROP_POLICIES:
+            raise KeyError('Unknown drop policy: {}!'.format(drop))
+        assert maxsize > 0
+        self.maxsize = maxsize
+        self.drop = drop
+        self.dropped = 0
+        self._frames = collections.deque()
+        self._error = None
+        self._put_waiter = None
+        self._get_waiter = None
+
+    def __len__(self):
+        return len(self._frames)
+
+    @asyncio.coroutine
+    def put(self, frame):
+        while self.drop == 'wait' and len(self._frames) >= self.maxsize:
+            self._put_waiter = asyncio.Future()
+            yield from self._put_waiter
+        if len(self._frames) >= self.maxsize:
+            self._frames.popleft()
+            self.dropped += 1
+        self._frames.append(frame)
+        self._get_waiter = self._wake(self._get_waiter)
+
+    def fail(self, exception):
+        # Consumer waiting for frames gets exception of producer
+        self._error = exception
+        self._get_waiter = self._wake(self._get_waiter)
+
+    @asyncio.coroutine
+    def get_latest(self):
+        while len(self._frames) == 0:
+            if self._error is not None:
+                raise Exception('Frames producer failed!') from self._error
+            self._get_waiter = asyncio.Future()
+            yield from self._get_waiter
+        frame = self._frames.pop()
+        self.dropped += len(self._frames)
+        self._frames.clear()
+        self._put_waiter = self._wake(self._put_waiter)
+        return frame
+
+    @staticmethod
+    def _wake(waiter):
+        if waiter is not None and not waiter.done():
+            waiter.set_result(True)
+        return None
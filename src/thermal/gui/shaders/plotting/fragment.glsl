@@ -1,6 +1,9 @@
 #line 1
 
-uniform sampler1D ys_tex;
+// ys_n values are stored in rows of ys_width texels
+uniform sampler2D ys_tex;
+uniform int ys_n;
+uniform int ys_width;
 uniform sampler2D colormap_tex;
 
 layout(location=0) out vec4 out_color;
@@ -9,10 +12,22 @@ float mapToYRange(float y) {
     return (y - y_range.x) / (y_range.y - y_range.x);
 }
 
+float fetchY(int i) {
+    i = clamp(i, 0, ys_n - 1);
+    return texelFetch(ys_tex, ivec2(i % ys_width, i / ys_width), 0).x;
+}
+
+float sampleY(float x) {
+    // The same linear interpolation between texel centers as of GL_LINEAR filtering, but across rows
+    float position = x * float(ys_n) - 0.5;
+    float i = floor(position);
+    return mix(fetchY(int(i)), fetchY(int(i) + 1), position - i);
+}
+
 void main(void)
 {
     vec2 xy = v2f.world_position;
-    float plot_y = mapToYRange(texture(ys_tex, xy.x).x);
+    float plot_y = mapToYRange(sampleY(xy.x));
     vec4 color = texture(colormap_tex, vec2(plot_y, 0.0f));
     float cur_y = mapToYRange(xy.y);
     out_color = color + (1.0 - color) * (clamp(pow(abs(cur_y - plot_y) / line_width, 0.1f), 0.0f, 1.0f));
@@ -4,15 +4,19 @@
 #
 
 import logging
-import pkg_resources
+import functools
 from pathlib import Path
+from importlib import import_module
 
 from thermal.utils import gl
 
 
 logger = logging.getLogger(__name__)
 
-shaders_path = Path(pkg_resources.get_provider('thermal.gui.shaders').get_resource_filename(__name__, '.'))
+
+@functools.lru_cache()
+def get_shaders_path():
+    return Path(import_module('thermal.gui.shaders').__file__).parent
 
 
 class ShadersFactory:
@@ -22,7 +26,7 @@ class ShadersFactory:
 
     def _detect_shaders(self):
         self._shaders_names = set()
-        for subdir in shaders_path.iterdir():
+        for subdir in get_shaders_path().iterdir():
             if not subdir.is_dir() or subdir.name.startswith('_'):
                 continue
             self._shaders_names.add(subdir.name)
@@ -34,7 +38,7 @@ class ShadersFactory:
         return sorted(self._shaders_names)
 
     def _get_lines(self, shader_name, file_name):
-        with (shaders_path / shader_name / '{}.glsl'.format(file_name)).open() as f:
+        with (get_shaders_path() / shader_name / '{}.glsl'.format(file_name)).open() as f:
             return f.readlines()
 
     def create_shader(self, shader_name):
@@ -8,7 +8,7 @@ import logging
 import cyglfw3 as glfw
 
 from thermal.utils import support
-from thermal.gui.helpers import FPSLimiter
+from thermal.gui.helpers import FPSLimiter, FramesQueue
 from thermal.gui.frames.plot2d import Plot2D
 from thermal.simulation import initial_generators
 from thermal.simulation.processor import SimulationProcessor
@@ -18,10 +18,13 @@ logger = logging.getLogger(__name__)
 
 class SimulationApp:
 
-    def __init__(self, processor=None):
+    def __init__(self, processor=None, frames_queue_size=2, frames_drop='wait'):
+        # Simulation runs ahead of rendering by up to frames_queue_size frames, see FramesQueue for frames_drop
         self._plotter = Plot2D()
         self._processor = processor or SimulationProcessor()
         self._cpu_executor = support.AsyncExecutor(1)
+        self._frames_queue_size = frames_queue_size
+        self._frames_drop = frames_drop
 
         self._rendering = None
         self._simulation_daemon = None
@@ -102,11 +105,41 @@ class SimulationApp:
             self._pause()
             self._tics_limiter = FPSLimiter(1 / self._params['view_dt'])
 
-            while not self._should_restart:
+            session = yield from self._cpu_executor.map(self._processor.open_session, ts, dx=dx, dt=dt, u=u, chi=chi,
+                                                        s=s, r=r, method_name=self._method_name, iters=iters)
+            frames = FramesQueue(self._frames_queue_size, self._frames_drop)
+            producer = asyncio.ensure_future(self._produce_frames(session, frames))
+            try:
+                while not self._should_restart:
+                    if self._paused is not None:
+                        yield from self._paused
+                    ts, values_range = yield from frames.get_latest()
+                    self._plotter.set_ys(ts, values_range)
+                    yield from self._tics_limiter.ensure_frame_limit()
+                    # print('{:.1f} FPS'.format(tics_limiter.get_fps()))
+            finally:
+                producer.cancel()
+                # Executor has one worker, so session is closed after the step in progress
+                yield from self._cpu_executor.map(session.close)
+
+    @asyncio.coroutine
+    def _produce_frames(self, session, frames):
+        # Next frames are computed while the current one is shown
+        try:
+            while True:
                 if self._paused is not None:
                     yield from self._paused
-                ts = yield from self._cpu_executor.map(self._processor.process, ts, dx=dx, dt=dt, u=u, chi=chi, s=s, r=r,
-                                                       method_name=self._method_name, iters=iters)
-                self._plotter.set_ys(ts)
-                yield from self._tics_limiter.ensure_frame_limit()
-                # print('{:.1f} FPS'.format(tics_limiter.get_fps()))
+                frame = yield from self._cpu_executor.map(self._next_frame, session)
+                yield from frames.put(frame)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            frames.fail(e)
+            raise
+
+    @staticmethod
+    def _next_frame(session):
+        # Range of values is reduced on device, so plotter does not scan them
+        session.step()
+        stats = session.get_stats()
+        return session.get(), (stats.min, stats.max)
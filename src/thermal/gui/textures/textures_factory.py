@@ -4,15 +4,19 @@
 #
 
 import logging
-import pkg_resources
+import functools
 from pathlib import Path
+from importlib import import_module
 
 from thermal.utils import gl
 
 
 logger = logging.getLogger(__name__)
 
-textures_path = Path(pkg_resources.get_provider('thermal.gui.textures.resources').get_resource_filename(__name__, '.'))
+
+@functools.lru_cache()
+def get_textures_path():
+    return Path(import_module('thermal.gui.textures.resources').__file__).parent
 
 
 class TexturesFactory:
@@ -22,7 +26,7 @@ class TexturesFactory:
 
     def _detect_textures(self):
         self._textures_names = set()
-        for path in textures_path.glob('*.png'):
+        for path in get_textures_path().glob('*.png'):
             self._textures_names.add(path.name.split('.')[0])
 
     def get_textures_names(self):
@@ -33,6 +37,6 @@ class TexturesFactory:
 
     @staticmethod
     def create_texture(texture_name):
-        path = textures_path / '{}.png'.format(texture_name)
+        path = get_textures_path() / '{}.png'.format(texture_name)
         (w, h), texture = gl.create_image_texture(path)
         return (w, h), texture
@@ -0,0 +1,133 @@
+#
+# Copyright (c) 2015, Nikolay Polyarnyi
+# All rights reserved.
+#
+
+import sys
+import json
+import time
+import argparse
+import numpy as np
+
+from thermal.simulation import initial_generators, checkpoints
+from thermal.simulation.processor import SimulationProcessor
+from thermal.simulation.snapshots import SnapshotWriter
+
+# The same defaults as in GUI (see thermal/main.py), but no GUI modules are imported, so no display is needed
+DEFAULT_CONFIG = dict(initial_function='linear_peak_function', method='explicit_central',
+                      n=100, iters=10, steps=100,
+                      dx=0.01, dt=0.01, u=0.05, chi=0.0025,
+                      r=None, s=None, precision='fp32', stability='off',
+                      tolerance=None, check_every=16,
+                      output=None, snapshots=None, snapshot_every=1, space_step=1,
+                      checkpoint=None, checkpoint_every=100, resume=None)
+
+
+def load_config(path):
+    with open(path) as f:
+        config = json.load(f)
+    unknown = set(config) - set(DEFAULT_CONFIG)
+    if len(unknown) > 0:
+        raise KeyError('Unknown config keys: {}!'.format(', '.join(sorted(unknown))))
+    return config
+
+
+def _open_session(config, processor):
+    if config['resume'] is not None:
+        return checkpoints.resume(config['resume'], processor)
+    n = config['n']
+    ts = getattr(initial_generators, config['initial_function'])(n, n // 2)
+    params = {key: config[key] for key in ['dx', 'dt', 'u', 'chi', 's', 'r', 'iters']}
+    return processor.open_session(ts, method_name=config['method'], **params)
+
+
+def run(config, processor=None, log=None):
+    config = dict(DEFAULT_CONFIG, **config)
+    if config['initial_function'] not in initial_generators.list_functions():
+        raise KeyError('Unknown initial function: {}!'.format(config['initial_function']))
+    if config['tolerance'] is not None and (config['snapshots'] is not None or config['checkpoint'] is not None):
+        raise Exception('Snapshots and checkpoints are not supported in runs until convergence!')
+    if config['resume'] is not None:
+        if config['snapshots'] is not None:
+            raise Exception('Snapshots are not supported in resumed runs!')
+        # Method and parameters are restored from checkpoint, precision should be the same too
+        metadata, _ = checkpoints.read_checkpoint(config['resume'])
+        config['precision'] = metadata['params']['precision']
+        if config['steps'] < metadata['steps_done']:
+            raise Exception('Run of {} steps can not be resumed from checkpoint after {} steps!'.format(
+                config['steps'], metadata['steps_done']))
+    processor = processor or SimulationProcessor(precision=config['precision'], stability_mode=config['stability'])
+
+    sink = None
+    if config['snapshots'] is not None:
+        sink = SnapshotWriter(config['snapshots'], every=config['snapshot_every'], space_step=config['space_step'])
+    start = time.time()
+    try:
+        with _open_session(config, processor) as session:
+            # Total number of steps of the run, resumed run makes only the rest of them
+            steps_before, steps = session.steps_done, config['steps'] - session.steps_done
+            if steps == 0:
+                # Resumed run is already complete
+                pass
+            elif config['checkpoint'] is not None:
+                checkpoints.run_with_checkpoints(session, steps, config['checkpoint'], processor,
+                                                 config['checkpoint_every'], sink)
+            elif config['tolerance'] is None:
+                session.run(steps, sink)
+            else:
+                stats = session.run_until_converged(config['tolerance'], steps, config['check_every'])
+                steps = session.steps_done - steps_before
+                if log is not None:
+                    log('{} after {} steps: residual {:.3e}, total {:.6e}, min {:.6e}, max {:.6e}'.format(
+                        'Converged' if session.converged else 'Not converged', steps,
+                        stats.residual_max, stats.total, stats.min, stats.max))
+            ts = session.get()
+    finally:
+        if sink is not None:
+            sink.close()
+    passed = time.time() - start
+
+    if config['output'] is not None:
+        np.save(config['output'], ts)
+    throughput = session.n * steps / passed if passed > 0 else float('inf')
+    if log is not None:
+        log('{}: {} steps ({} sub-steps each) of {} cells in {:.3f} s ({:.3e} cells*steps/s)'.format(
+            session.method_name, steps, session.substeps, session.n, passed, throughput))
+    return ts, throughput
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description='Runs simulation without GUI.')
+    parser.add_argument('--config', help='path to JSON file with any of the options below (options override it)')
+    parser.add_argument('--initial-function', dest='initial_function',
+                        help='one of: {}'.format(', '.join(initial_generators.list_functions())))
+    parser.add_argument('--method', help='method name, optionally with @backend')
+    parser.add_argument('--n', type=int)
+    parser.add_argument('--iters', type=int, help='steps per dt')
+    parser.add_argument('--steps', type=int, help='total number of steps (each of dt/iters)')
+    for name in ['dx', 'dt', 'u', 'chi', 's', 'r']:
+        parser.add_argument('--{}'.format(name), type=float)
+    parser.add_argument('--precision', choices=['fp32', 'fp64', 'fp16'])
+    parser.add_argument('--stability', choices=['off', 'auto', 'reject', 'implicit'],
+                        help='what to do with unstable explicit method (see thermal.simulation.stability)')
+    parser.add_argument('--tolerance', type=float,
+                        help='stop when max residual of a step is below it (--steps is then the limit)')
+    parser.add_argument('--check-every', dest='check_every', type=int, help='steps between residual checks')
+    parser.add_argument('--output', help='path to write final state as .npy')
+    parser.add_argument('--snapshots', help='path to write snapshots (see thermal.simulation.snapshots)')
+    parser.add_argument('--snapshot-every', dest='snapshot_every', type=int, help='steps between snapshots')
+    parser.add_argument('--space-step', dest='space_step', type=int, help='cells between snapshot samples')
+    parser.add_argument('--checkpoint',
+                        help='path to write checkpoint of full state to (see thermal.simulation.checkpoints)')
+    parser.add_argument('--checkpoint-every', dest='checkpoint_every', type=int, help='steps between checkpoints')
+    parser.add_argument('--resume', help='path to checkpoint to continue run from (up to --steps in total)')
+    args = vars(parser.parse_args(args))
+
+    config_path = args.pop('config')
+    config = load_config(config_path) if config_path is not None else {}
+    config.update({key: value for key, value in args.items() if value is not None})
+    run(config, log=print)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,174 @@
+#
+# Copyright (c) 2015, Nikolay Polyarnyi
+# All rights reserved.
+#
+
+import os
+import json
+import weakref
+import hashlib
+import logging
+import collections
+import numpy as np
+from pathlib import Path
+
+from thermal.simulation.processor import SimulationProcessor
+
+logger = logging.getLogger(__name__)
+
+
+class ResultCache:
+    """
+    States of simulations by key of the run (see CachedProcessor.get_key) and number of steps made from initial state.
+    Up to `memory_items` recently used states are kept in memory. If `disk_dir` is given, states are also stored
+    in it as .npy files, up to `disk_max_bytes` in total, least recently used files are evicted.
+    """
+
+    def __init__(self, memory_items=32, disk_dir=None, disk_max_bytes=2 ** 30):
+        self._memory_items = memory_items
+        self._memory = collections.OrderedDict()
+        self._disk_dir = None if disk_dir is None else Path(str(disk_dir))
+        self._disk_max_bytes = disk_max_bytes
+        if self._disk_dir is not None:
+            os.makedirs(str(self._disk_dir), exist_ok=True)
+
+    def _path(self, key, steps):
+        return self._disk_dir / '{}.{}.npy'.format(key, steps)
+
+    def put(self, key, steps, ts):
+        ts = np.array(ts)
+        self._put_to_memory(key, steps, ts)
+        if self._disk_dir is not None and not self._path(key, steps).exists():
+            path = self._path(key, steps)
+            tmp_path = path.with_suffix('.tmp')
+            with tmp_path.open('wb') as f:
+                np.save(f, ts)
+            os.replace(str(tmp_path), str(path))
+            self._evict_from_disk()
+
+    def _put_to_memory(self, key, steps, ts):
+        self._memory[key, steps] = ts
+        self._memory.move_to_end((key, steps))
+        while len(self._memory) > self._memory_items:
+            self._memory.popitem(last=False)
+
+    def _evict_from_disk(self):
+        files = [(path.stat(), path) for path in self._disk_dir.glob('*.npy')]
+        total = sum(stat.st_size for stat, path in files)
+        for stat, path in sorted(files, key=lambda item: item[0].st_mtime):
+            if total <= self._disk_max_bytes:
+                break
+            path.unlink()
+            total -= stat.st_size
+
+    def get(self, key, steps):
+        # Copy of cached state or None
+        if (key, steps) in self._memory:
+            self._memory.move_to_end((key, steps))
+            return self._memory[key, steps].copy()
+        if self._disk_dir is not None and self._path(key, steps).exists():
+            path = self._path(key, steps)
+            # Modification time is the time of last use for eviction
+            os.utime(str(path))
+            ts = np.load(str(path))
+            self._put_to_memory(key, steps, ts)
+            return ts.copy()
+        return None
+
+    def get_steps(self, key):
+        steps = set(cached_steps for cached_key, cached_steps in self._memory if cached_key == key)
+        if self._disk_dir is not None:
+            steps.update(int(path.name.split('.')[1]) for path in self._disk_dir.glob('{}.*.npy'.format(key)))
+        return sorted(steps)
+
+    def find_longest(self, key, max_steps=None):
+        # (steps, state) of the longest cached prefix of the run with at most max_steps steps, or (0, None)
+        for steps in reversed(self.get_steps(key)):
+            if max_steps is None or steps <= max_steps:
+                ts = self.get(key, steps)
+                if ts is not None:
+                    return steps, ts
+        return 0, None
+
+
+class CheckpointSink:
+    # Sink for SimulationSession.run that puts states into cache every `every` steps
+
+    def __init__(self, cache, key, every):
+        self.cache = cache
+        self.key = key
+        self.every = every
+
+    def write(self, step, ts):
+        if step > 0:
+            self.cache.put(self.key, step, ts)
+
+
+class CachedProcessor:
+    """
+    SimulationProcessor with results memoized in ResultCache. Runs are keyed by hash of initial state, method,
+    sources of its kernels, precision, stability mode and parameters. States are checkpointed every
+    `checkpoint_every` steps, so a longer run of the same scenario continues from the longest cached prefix
+    (except of multi-level methods, which need previous time level too).
+    Other methods are the same as of the processor.
+    """
+
+    def __init__(self, processor=None, cache=None, checkpoint_every=None):
+        self.processor = processor or SimulationProcessor()
+        self.cache = cache or ResultCache()
+        self.checkpoint_every = checkpoint_every
+        self._sessions_keys = weakref.WeakKeyDictionary()
+
+    def __getattr__(self, name):
+        return getattr(self.processor, name)
+
+    def get_key(self, ts,
+                *, dx, dt, u, chi, s=None, r=None,
+                iters=1, method_name: str):
+        ts = np.ascontiguousarray(ts)
+        h = hashlib.sha1()
+        h.update('{} {}'.format(ts.dtype.str, ts.shape).encode())
+        h.update(ts.tobytes())
+        description = dict(method_name=method_name, kernels=self.processor.get_kernels_version(method_name),
+                           precision=self.processor.precision, stability_mode=self.processor.stability_mode,
+                           iters=iters)
+        for name, value in dict(dx=dx, dt=dt, u=u, chi=chi, s=s, r=r).items():
+            description[name] = None if value is None else np.float64(value).tolist()
+        h.update(json.dumps(description, sort_keys=True).encode())
+        return h.hexdigest()
+
+    def open_session(self, ts, *, max_steps=None, **params):
+        # Session started from the longest cached state of the run with at most max_steps steps,
+        # its steps_done is the number of steps of that state
+        key = self.get_key(ts, **params)
+        steps, cached = self.cache.find_longest(key, max_steps)
+        session = self.processor.open_session(ts, **params)
+        if cached is not None and not session.multilevel:
+            session.close()
+            session = self.processor.open_session(cached, **params)
+            session.steps_done = steps
+            logger.debug('Run {} continues from cached state after {} steps'.format(key, steps))
+        self._sessions_keys[session] = key
+        return session
+
+    def get_sink(self, session):
+        # Sink for session.run of session opened by open_session, so that its states are checkpointed
+        return CheckpointSink(self.cache, self._sessions_keys[session], self.checkpoint_every or 1)
+
+    def process(self, ts, *, steps=None, **params):
+        # Makes steps iterations (each of dt / iters, as session.step(steps) does) or takes result from cache,
+        # by default makes iters of them, i.e. the same as SimulationProcessor.process
+        steps = params.get('iters', 1) if steps is None else steps
+        key = self.get_key(ts, **params)
+        cached = self.cache.get(key, steps)
+        if cached is not None:
+            return cached
+
+        with self.open_session(ts, max_steps=steps, **params) as session:
+            if self.checkpoint_every is None:
+                session.step(steps - session.steps_done)
+            else:
+                session.run(steps - session.steps_done, self.get_sink(session))
+            ts = session.get()
+        self.cache.put(key, steps, ts)
+        return ts
@@ -0,0 +1,109 @@
+#
+# Copyright (c) 2015, Nikolay Polyarnyi
+# All rights reserved.
+#
+
+import os
+import json
+import logging
+import numpy as np
+
+from thermal.simulation.session import GridSession
+from thermal.simulation.processor import SimulationProcessor, GridProcessor
+
+logger = logging.getLogger(__name__)
+
+# Checkpoint file: MAGIC, length of JSON header as uint64, header and then raw time levels of scheme state
+# (from the oldest one to the current state) in storage dtype, aligned to DATA_ALIGNMENT bytes
+MAGIC = b'THERMCP1'
+DATA_ALIGNMENT = 64
+
+
+def _encode(value):
+    # Parameters keep their dtype, so that the restored session computes exactly the same
+    if isinstance(value, (str, int, float)):
+        return value
+    value = np.asarray(value)
+    return dict(dtype=value.dtype.str, value=value.tolist())
+
+
+def _decode(value):
+    if not isinstance(value, dict):
+        return value
+    value = np.array(value['value'], np.dtype(value['dtype']))
+    return value if value.ndim > 0 else value[()]
+
+
+def write_checkpoint(path, session, processor):
+    """
+    Writes full state of session: all time levels (both of them for explicit_leapfrog), number of steps done,
+    parameters and version of kernels of the method. File is written to '<path>.tmp' and then atomically
+    replaces previous checkpoint, so a killed run always leaves a complete checkpoint.
+    """
+    path = str(path)
+    levels = session.get_levels()
+    metadata = dict(method_name=session.method_name, kernels=processor.get_kernels_version(session.method_name),
+                    grid=isinstance(session, GridSession), steps_done=session.steps_done,
+                    params={name: _encode(value) for name, value in session.params.items()},
+                    dtype=session.dtype.str, shape=list(session.shape), levels=len(levels))
+    header = json.dumps(metadata).encode()
+    offset = -(-(len(MAGIC) + 8 + len(header)) // DATA_ALIGNMENT) * DATA_ALIGNMENT
+
+    tmp_path = '{}.tmp'.format(path)
+    with open(tmp_path, 'wb') as f:
+        f.write(MAGIC + np.uint64(len(header)).tobytes() + header)
+        f.truncate(offset + session.dtype.itemsize * int(np.prod(session.shape)) * len(levels))
+    data = np.memmap(tmp_path, session.dtype, 'r+', offset=offset, shape=(len(levels),) + session.shape)
+    for i, level in enumerate(levels):
+        data[i] = level
+    data.flush()
+    del data
+    with open(tmp_path, 'rb+') as f:
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def read_checkpoint(path):
+    # Returns metadata and memory-mapped time levels
+    path = str(path)
+    with open(path, 'rb') as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise Exception('{} is not a checkpoint!'.format(path))
+        header_length = int(np.frombuffer(f.read(8), np.uint64)[0])
+        metadata = json.loads(f.read(header_length).decode())
+    offset = -(-(len(MAGIC) + 8 + header_length) // DATA_ALIGNMENT) * DATA_ALIGNMENT
+    levels = np.memmap(path, np.dtype(metadata['dtype']), 'r', offset=offset,
+                       shape=(metadata['levels'],) + tuple(metadata['shape']))
+    return metadata, levels
+
+
+def resume(path, processor=None):
+    """
+    Opens session from checkpoint, it continues bit-for-bit as the run that wrote the checkpoint
+    (with the same kernels of the method, precision and processor settings).
+    """
+    metadata, levels = read_checkpoint(path)
+    params = {name: _decode(value) for name, value in metadata['params'].items()}
+    if processor is None:
+        processor = (GridProcessor if metadata['grid'] else SimulationProcessor)(precision=params['precision'])
+    if processor.precision != params['precision']:
+        raise Exception('Checkpoint is in {}, but processor is in {}!'.format(params['precision'],
+                                                                           processor.precision))
+    method_name = metadata['method_name']
+    if processor.get_kernels_version(method_name) != metadata['kernels']:
+        raise Exception('Kernels of {} changed since checkpoint {} was written!'.format(method_name, path))
+
+    session = processor.create_session(np.array(levels[-1]), method_name, **params)
+    if len(levels) > 1:
+        session.set_previous_level(np.array(levels[0]))
+    session.steps_done = metadata['steps_done']
+    return session
+
+
+def run_with_checkpoints(session, steps, path, processor, every, sink=None):
+    # session.run(steps, sink) with checkpoint written every `every` steps and after the last step
+    end = session.steps_done + steps
+    while session.steps_done < end:
+        session.run(min(end - session.steps_done, every - session.steps_done % every), sink)
+        write_checkpoint(path, session, processor)
+    return session
@@ -0,0 +1,413 @@
+#
+# Copyright (c) 2015, Nikolay Polyarnyi
+# All rights reserved.
+#
+
+import logging
+import numpy as np
+import pyopencl as cl
+import pyopencl.array
+
+from thermal.simulation.session import SimulationSession, GridSession, reduce_stats
+
+logger = logging.getLogger(__name__)
+
+# Kernels of each precision mode are built from the same sources with these options, see kernels/_common.cl
+PRECISION_BUILD_OPTIONS = {
+    'fp32': [],
+    'fp64': ['-D', 'PRECISION_FP64'],
+    'fp16': ['-D', 'PRECISION_FP16'],
+}
+
+
+def supports_precision(context: cl.Context, precision):
+    if precision == 'fp64':
+        return all('cl_khr_fp64' in device.extensions.split() for device in context.devices)
+    return True
+
+
+# Work-group size of temporal blocking kernels is limited by this, and by default
+# each launch advances local_size // BLOCK_STEPS_DIVISOR steps
+MAX_BLOCK_LOCAL_SIZE = 256
+BLOCK_STEPS_DIVISOR = 16
+
+
+def choose_blocking(kernel: cl.Kernel, device: cl.Device, block_steps=None):
+    local_size = min(MAX_BLOCK_LOCAL_SIZE,
+                     kernel.get_work_group_info(cl.kernel_work_group_info.WORK_GROUP_SIZE, device))
+    if block_steps is None:
+        # CPU devices emulate local memory and barriers, so there blocking only adds redundant halo work
+        if not device.type & cl.device_type.GPU:
+            return local_size, 1
+        block_steps = local_size // BLOCK_STEPS_DIVISOR
+    # At least a half of each tile should be written back, the rest is halo
+    block_steps = max(1, min(block_steps, local_size // 4))
+    return local_size, block_steps
+
+
+# Reduction of stats (see kernels/_stats.cl) is made by at most so many work-groups of at most so many items,
+# partial results of work-groups are reduced on host
+STATS_LOCAL_SIZE = 64
+STATS_MAX_GROUPS = 64
+STATS_COUNT = 5
+
+
+def enqueue_stats(queue, kernel: cl.Kernel, ts_cl, ts_prev_cl, batch, n, dtype, from_i=0, to_i=None):
+    # Returns partial stats of shape (batch, work-groups, STATS_COUNT) of cells [from_i, to_i) of each member
+    to_i = n if to_i is None else to_i
+    max_local_size = min(STATS_LOCAL_SIZE,
+                         kernel.get_work_group_info(cl.kernel_work_group_info.WORK_GROUP_SIZE, queue.device))
+    local_size = 2 ** int(np.log2(max_local_size))
+    groups = max(1, min(STATS_MAX_GROUPS, (to_i - from_i + local_size - 1) // local_size))
+    partial_stats_cl = cl.array.empty(queue, batch * groups * STATS_COUNT, dtype)
+    kernel(queue, (groups * local_size, batch), (local_size, 1),
+           ts_cl.data, ts_prev_cl.data, partial_stats_cl.data, np.int32(n), np.int32(from_i), np.int32(to_i),
+           cl.LocalMemory(dtype.itemsize * STATS_COUNT * local_size))
+    return partial_stats_cl.get(queue).reshape(batch, groups, STATS_COUNT)
+
+
+def choose_tile(kernel: cl.Kernel, device: cl.Device, tiled=None):
+    # Work-group size (x, y) of tiled grid kernels or None if tiling is off
+    if tiled is None:
+        # As with temporal blocking, local memory only adds overhead on CPU devices
+        tiled = bool(device.type & cl.device_type.GPU)
+    if not tiled:
+        return None
+    local_size = min(MAX_BLOCK_LOCAL_SIZE,
+                     kernel.get_work_group_info(cl.kernel_work_group_info.WORK_GROUP_SIZE, device))
+    tile_x = min(32, local_size)
+    return tile_x, max(1, local_size // tile_x)
+
+
+class ClSession(SimulationSession):
+
+    def __init__(self, context: cl.Context, program: cl.Program, ts, method_name, block_steps=None, device=None,
+                 **params):
+        if not isinstance(ts, cl.array.Array):
+            ts = np.asarray(ts)
+        super().__init__(method_name, ts.shape, **params)
+        self._kernels = {kernel.function_name: kernel for kernel in program.all_kernels()}
+        device = device or context.devices[0]
+        self._queue = cl.CommandQueue(context, device)
+
+        size = self.batch * self.n
+        self._global_size = (self.n, self.batch)
+        self._n = np.int32(self.n)
+        self._params_cl = cl.array.to_device(self._queue, self._params.astype(self.compute_dtype))
+
+        if isinstance(ts, cl.array.Array):
+            ts = ts.astype(self.dtype, queue=self._queue) if ts.dtype != self.dtype else ts.copy(self._queue)
+            self._ts_cl = ts.reshape(size)
+        else:
+            self._ts_cl = cl.array.to_device(self._queue, np.ascontiguousarray(ts, self.dtype).ravel())
+        self._ts_res_cl = cl.array.empty(self._queue, size, self.dtype)
+
+        # Second time level of multi-level schemes (i.e. explicit_leapfrog), None until the first step
+        self.multilevel = 'init' in self._kernels
+        self._ts_prev_cl = None
+        # Copy of state to compute residual of a step, allocated on first use
+        self._ts_saved_cl = None
+
+        # Two-level explicit schemes advance several steps per launch, see solve_blocked in kernels/_explicit.cl
+        self._block_local_size, self._block_steps = None, 1
+        if 'solve_blocked' in self._kernels:
+            self._block_local_size, self._block_steps = choose_blocking(self._kernels['solve_blocked'],
+                                                                        device, block_steps)
+
+        # Implicit schemes solve tridiagonal system on each step with parallel cyclic reduction
+        self._implicit = 'pcr_init' in self._kernels
+        if self._implicit:
+            self._rows_cl = cl.array.empty(self._queue, 4 * size, self.compute_dtype)
+            self._rows_res_cl = cl.array.empty(self._queue, 4 * size, self.compute_dtype)
+
+    def _step(self, iters):
+        if self._implicit:
+            self._step_implicit(iters)
+        elif self._block_steps > 1:
+            self._step_blocked(iters)
+        else:
+            self._step_explicit(iters)
+
+    def _step_implicit(self, iters):
+        for i in range(iters):
+            self._kernels['pcr_init'](self._queue, self._global_size, None,
+                                      self._ts_cl.data, self._rows_cl.data, self._params_cl.data, self._n)
+            stride = 2
+            while stride < self.n:
+                self._kernels['pcr_reduce'](self._queue, self._global_size, None,
+                                            self._rows_cl.data, self._rows_res_cl.data, np.int32(stride), self._n)
+                self._rows_cl, self._rows_res_cl = self._rows_res_cl, self._rows_cl
+                stride *= 2
+            self._kernels['pcr_finish'](self._queue, self._global_size, None,
+                                        self._rows_cl.data, self._ts_res_cl.data, self._n)
+            self._ts_cl, self._ts_res_cl = self._ts_res_cl, self._ts_cl
+
+    def _step_explicit(self, iters):
+        if self.multilevel and self._ts_prev_cl is None:
+            self._kernels['init'](self._queue, self._global_size, None,
+                                  self._ts_cl.data, self._ts_res_cl.data, self._params_cl.data, self._n)
+            self._ts_prev_cl, self._ts_cl, self._ts_res_cl = self._ts_cl, self._ts_res_cl, \
+                cl.array.empty_like(self._ts_cl)
+            iters -= 1
+
+        for i in range(iters):
+            if self.multilevel:
+                self._kernels['solve'](self._queue, self._global_size, None,
+                                       self._ts_prev_cl.data, self._ts_cl.data, self._ts_res_cl.data,
+                                       self._params_cl.data, self._n)
+                self._ts_prev_cl, self._ts_cl, self._ts_res_cl = self._ts_cl, self._ts_res_cl, self._ts_prev_cl
+            else:
+                self._kernels['solve'](self._queue, self._global_size, None,
+                                       self._ts_cl.data, self._ts_res_cl.data, self._params_cl.data, self._n)
+                self._ts_cl, self._ts_res_cl = self._ts_res_cl, self._ts_cl
+
+    def _step_blocked(self, iters):
+        local_size = self._block_local_size
+        while iters > 1:
+            steps = min(iters, self._block_steps)
+            tiles_count = (self.n + local_size - 2 * steps - 1) // (local_size - 2 * steps)
+            self._kernels['solve_blocked'](self._queue, (tiles_count * local_size, self.batch), (local_size, 1),
+                                           self._ts_cl.data, self._ts_res_cl.data, self._params_cl.data, self._n,
+                                           np.int32(steps), cl.LocalMemory(self.dtype.itemsize * local_size))
+            self._ts_cl, self._ts_res_cl = self._ts_res_cl, self._ts_cl
+            iters -= steps
+        self._step_explicit(iters)
+
+    def _get_state(self):
+        return self._ts_cl
+
+    def _save_state(self):
+        if self._ts_saved_cl is None:
+            self._ts_saved_cl = cl.array.empty_like(self._ts_cl)
+        cl.enqueue_copy(self._queue, self._ts_saved_cl.data, self._ts_cl.data)
+        return self._ts_saved_cl
+
+    def _partial_stats(self, previous, from_i=0, to_i=None):
+        # Stats kernel compares with current state itself when there is no previous one, residuals are zeros
+        previous = self._get_state() if previous is None else previous
+        return enqueue_stats(self._queue, self._kernels['stats'], self._ts_cl, previous, self.batch, self.n,
+                             self.compute_dtype, from_i, to_i)
+
+    def _stats(self, previous):
+        return reduce_stats(self._partial_stats(previous), self.n)
+
+    def get_levels(self):
+        return ([] if self._ts_prev_cl is None else [self._ts_prev_cl.get(self._queue).reshape(self.shape)]) \
+            + [self.get()]
+
+    def set_previous_level(self, ts_prev):
+        assert self.multilevel
+        self._ts_prev_cl = cl.array.to_device(self._queue, np.ascontiguousarray(ts_prev, self.dtype).ravel())
+
+    def get_device_array(self) -> cl.array.Array:
+        return self._ts_cl.reshape(self.shape)
+
+    def get(self):
+        return self._ts_cl.get(self._queue).reshape(self.shape)
+
+    def finish(self):
+        self._queue.finish()
+
+    def close(self):
+        self._queue.finish()
+        self._ts_prev_cl, self._ts_cl, self._ts_res_cl, self._ts_saved_cl = None, None, None, None
+        self._rows_cl, self._rows_res_cl = None, None
+
+
+class DecomposedClSession(SimulationSession):
+    """
+    Splits the domain of two-level explicit scheme into parts, each is simulated by its own ClSession
+    on its own device (parts are assigned to devices of context round-robin).
+    Each part also holds `exchange_steps` halo cells of its neighbours, so it can advance that many steps
+    independently. Cells needed by neighbours (edge strips of own cells) are advanced by small edge sessions
+    on separate queues, so their transfer to neighbours devices overlaps the compute of the whole part.
+    Transferred strips are copied into halos after the part finishes its steps, without host synchronization.
+    """
+
+    def __init__(self, context: cl.Context, program: cl.Program, ts, method_name,
+                 parts=None, exchange_steps=16, block_steps=None, **params):
+        ts = np.asarray(ts)
+        super().__init__(method_name, ts.shape, **params)
+        parts = parts or len(context.devices)
+        # Own cells of each part should cover halo of its neighbour
+        parts = max(1, min(parts, self.n // exchange_steps))
+        self.exchange_steps = exchange_steps
+
+        bounds = np.linspace(0, self.n, parts + 1).astype(np.int64)
+        self._owned = list(zip(bounds[:-1], bounds[1:]))
+        self._halos = [(exchange_steps if from_i > 0 else 0, exchange_steps if to_i < self.n else 0)
+                       for from_i, to_i in self._owned]
+        # Parts make kernel steps of this session, so they have no sub-steps of their own
+        part_params = dict(params, dt=np.divide(params['dt'], self.substeps), substeps=1)
+        self._parts, self._copy_queues, self._edges = [], [], []
+        for part, ((from_i, to_i), (left_halo, right_halo)) in enumerate(zip(self._owned, self._halos)):
+            device = context.devices[part % len(context.devices)]
+            part_ts = ts[..., from_i - left_halo:to_i + right_halo]
+            self._parts.append(ClSession(context, program, part_ts, method_name,
+                                         block_steps=block_steps, device=device, **part_params))
+            # Halo strips from neighbours are transferred by this queue to staging buffers of the part
+            self._copy_queues.append(cl.CommandQueue(context, device))
+
+            # Edge strip of k own cells after k steps depends on k cells at each side of it, so edge session
+            # has 3 * k cells (or less at the borders of domain), strip is its middle
+            part_n, k = part_ts.shape[-1], exchange_steps
+            edges = {}
+            for side, halo, from_j, strip_j in [(-1, left_halo, 0, k), (1, right_halo, max(0, part_n - 3 * k),
+                                                                        part_n - 2 * k)]:
+                if halo == 0:
+                    continue
+                to_j = min(from_j + 3 * k, part_n)
+                edge = ClSession(context, program, np.zeros(part_ts.shape[:-1] + (to_j - from_j,)), method_name,
+                                 block_steps=block_steps, device=device, **part_params)
+                staging_cl = cl.array.empty(self._copy_queues[-1], self.batch * k, self.dtype)
+                # Events of transfer of the strip that reads edge buffer and of copy of staging buffer into halo
+                edges[side] = dict(session=edge, from_j=from_j, strip_j=strip_j, staging_cl=staging_cl,
+                                   sent=[], consumed=[])
+            self._edges.append(edges)
+        logger.debug('Domain of {} cells is split into parts {} over {} devices'.format(
+            self.n, self._owned, len(context.devices)))
+
+    @staticmethod
+    def supports(program: cl.Program):
+        kernel_names = [kernel.function_name for kernel in program.all_kernels()]
+        return 'solve' in kernel_names and 'init' not in kernel_names and 'pcr_init' not in kernel_names
+
+    def _copy_cells(self, queue, dst_cl, dst_n, dst_offset, src_cl, src_n, src_offset, count, wait_for):
+        # Copies cells [src_offset, src_offset + count) of each batch member, returns events
+        itemsize = self.dtype.itemsize
+        return [cl.enqueue_copy(queue, dst_cl.data, src_cl.data, byte_count=itemsize * count,
+                                src_offset=itemsize * (b * src_n + src_offset),
+                                dst_offset=itemsize * (b * dst_n + dst_offset), wait_for=wait_for)
+                for b in range(self.batch)]
+
+    def _step(self, iters):
+        while iters > 0:
+            steps = min(iters, self.exchange_steps)
+            self._step_exchanged(steps)
+            iters -= steps
+
+    def _step_exchanged(self, steps):
+        k = self.exchange_steps
+        received = [[] for part in self._parts]
+        for i, (part, edges) in enumerate(zip(self._parts, self._edges)):
+            for side, edge in edges.items():
+                edge_session = edge['session']
+                # Edge session starts from the same state as the part, after previous strip was sent
+                copied = self._copy_cells(part._queue, edge_session._ts_cl, edge_session.n, 0,
+                                          part._ts_cl, part.n, edge['from_j'], edge_session.n, edge['sent'])
+                cl.enqueue_barrier(edge_session._queue, wait_for=copied)
+                edge_session.step(steps)
+                computed = cl.enqueue_marker(edge_session._queue)
+
+                # Strip is sent to staging buffer of the neighbour while both parts compute
+                neighbour = i + side
+                neighbour_edge = self._edges[neighbour][-side]
+                edge['sent'] = self._copy_cells(self._copy_queues[neighbour], neighbour_edge['staging_cl'], k, 0,
+                                                edge_session._ts_cl, edge_session.n,
+                                                edge['strip_j'] - edge['from_j'], k,
+                                                [computed] + neighbour_edge['consumed'])
+                received[neighbour].extend(edge['sent'])
+            part.step(steps)
+
+        for part, edges, part_received in zip(self._parts, self._edges, received):
+            for side, edge in edges.items():
+                halo_j = 0 if side < 0 else part.n - k
+                edge['consumed'] = self._copy_cells(part._queue, part._ts_cl, part.n, halo_j,
+                                                    edge['staging_cl'], k, 0, k, part_received)
+
+    def _get_state(self):
+        return [part._get_state() for part in self._parts]
+
+    def _save_state(self):
+        return [part._save_state() for part in self._parts]
+
+    def _stats(self, previous):
+        previous = self._get_state() if previous is None else previous
+        partial_stats = [part._partial_stats(part_previous, left_halo, part.n - right_halo)
+                         for part, part_previous, (left_halo, right_halo) in zip(self._parts, previous, self._halos)]
+        return reduce_stats(np.concatenate(partial_stats, axis=1), self.n)
+
+    def get(self):
+        owned = [part.get()[..., left_halo:part.n - right_halo]
+                 for part, (left_halo, right_halo) in zip(self._parts, self._halos)]
+        return np.concatenate(owned, axis=-1)
+
+    def finish(self):
+        for part, copy_queue, edges in zip(self._parts, self._copy_queues, self._edges):
+            part.finish()
+            copy_queue.finish()
+            for edge in edges.values():
+                edge['session'].finish()
+
+    def close(self):
+        self.finish()
+        for part, edges in zip(self._parts, self._edges):
+            part.close()
+            for edge in edges.values():
+                edge['session'].close()
+                edge['staging_cl'] = None
+
+
+class GridClSession(GridSession):
+
+    def __init__(self, context: cl.Context, program: cl.Program, ts, method_name, tiled=None, device=None, **params):
+        ts = np.asarray(ts)
+        super().__init__(method_name, ts.shape, **params)
+        self._kernels = {kernel.function_name: kernel for kernel in program.all_kernels()}
+        device = device or context.devices[0]
+        self._queue = cl.CommandQueue(context, device)
+
+        nz, ny, nx = (1,) * (3 - len(self.shape)) + self.shape
+        self._sizes = (np.int32(nx), np.int32(ny), np.int32(nz))
+        self._params_cl = cl.array.to_device(self._queue, self._params.astype(self.compute_dtype))
+        self._ts_cl = cl.array.to_device(self._queue, np.ascontiguousarray(ts, self.dtype).ravel())
+        self._ts_res_cl = cl.array.empty_like(self._ts_cl)
+        self._ts_saved_cl = None
+
+        self._tile = choose_tile(self._kernels['solve_tiled'], device, tiled)
+        if self._tile is None:
+            self._global_size, self._local_size = (nx, ny, nz), None
+        else:
+            tile_x, tile_y = self._tile
+            self._global_size = ((nx + tile_x - 1) // tile_x * tile_x, (ny + tile_y - 1) // tile_y * tile_y, nz)
+            self._local_size = (tile_x, tile_y, 1)
+            self._tile_cl = cl.LocalMemory(self.compute_dtype.itemsize * (tile_x + 2) * (tile_y + 2))
+
+    def _step(self, iters):
+        for i in range(iters):
+            if self._tile is None:
+                self._kernels['solve'](self._queue, self._global_size, None,
+                                       self._ts_cl.data, self._ts_res_cl.data, self._params_cl.data, *self._sizes)
+            else:
+                self._kernels['solve_tiled'](self._queue, self._global_size, self._local_size,
+                                             self._ts_cl.data, self._ts_res_cl.data, self._params_cl.data,
+                                             *(self._sizes + (self._tile_cl,)))
+            self._ts_cl, self._ts_res_cl = self._ts_res_cl, self._ts_cl
+
+    def _get_state(self):
+        return self._ts_cl
+
+    def _save_state(self):
+        if self._ts_saved_cl is None:
+            self._ts_saved_cl = cl.array.empty_like(self._ts_cl)
+        cl.enqueue_copy(self._queue, self._ts_saved_cl.data, self._ts_cl.data)
+        return self._ts_saved_cl
+
+    def _stats(self, previous):
+        previous = self._get_state() if previous is None else previous
+        size = self._ts_cl.size
+        return reduce_stats(enqueue_stats(self._queue, self._kernels['stats'], self._ts_cl, previous, 1, size,
+                                          self.compute_dtype), size)
+
+    def get_device_array(self) -> cl.array.Array:
+        return self._ts_cl.reshape(self.shape)
+
+    def get(self):
+        return self._ts_cl.get(self._queue).reshape(self.shape)
+
+    def finish(self):
+        self._queue.finish()
+
+    def close(self):
+        self._queue.finish()
+        self._ts_cl, self._ts_res_cl, self._ts_saved_cl = None, None, None
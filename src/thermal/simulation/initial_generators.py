@@ -47,3 +47,44 @@ def peak_function(n, i, peak_value=1, others_value=0, dtype=np.float32):
 
 def list_functions():
     return ['linear_peak_function', 'step_function', 'peak_function']
+
+
+# Generators of 2-D and 3-D grids take shape of grid and center (index per axis) instead of n and i
+
+def grid_linear_peak_function(shape, center, vi=1, v_border=0, dtype=np.float32):
+    """
+    >>> grid_linear_peak_function((3, 5), (1, 2), vi=4).tolist()
+    [[0.0, 0.0, 0.0, 0.0, 0.0], [0.0, 2.0, 4.0, 2.0, 0.0], [0.0, 0.0, 0.0, 0.0, 0.0]]
+    """
+    xs = np.ones(shape, dtype)
+    for axis, (n, i) in enumerate(zip(shape, center)):
+        profile_shape = [1] * len(shape)
+        profile_shape[axis] = n
+        xs *= linear_peak_function(n, i, dtype=dtype).reshape(profile_shape)
+    return v_border + (vi - v_border) * xs
+
+
+def grid_step_function(shape, center, before_value=1, after_value=0, dtype=np.float32):
+    """
+    >>> grid_step_function((3, 4), (2, 1)).tolist()
+    [[1.0, 0.0, 0.0, 0.0], [1.0, 0.0, 0.0, 0.0], [0.0, 0.0, 0.0, 0.0]]
+    """
+    xs = np.zeros(shape, dtype)
+    xs[...] = after_value
+    xs[tuple(slice(None, i) for i in center)] = before_value
+    return xs
+
+
+def grid_peak_function(shape, center, peak_value=1, others_value=0, dtype=np.float32):
+    """
+    >>> grid_peak_function((2, 2, 2), (1, 0, 1)).tolist()
+    [[[0.0, 0.0], [0.0, 0.0]], [[0.0, 1.0], [0.0, 0.0]]]
+    """
+    xs = np.zeros(shape, dtype)
+    xs[...] = others_value
+    xs[tuple(center)] = peak_value
+    return xs
+
+
+def list_grid_functions():
+    return ['grid_linear_peak_function', 'grid_step_function', 'grid_peak_function']
@@ -0,0 +1,40 @@
+#line 1
+
+// Precision is chosen by build options, see PRECISION_BUILD_OPTIONS in cl_session.py:
+// real - type of arithmetic, storage - type of state buffers, LOAD/STORE - access to state buffers
+#if defined(PRECISION_FP64)
+#pragma OPENCL EXTENSION cl_khr_fp64 : enable
+typedef double  real;
+typedef double3 real3;
+typedef double4 real4;
+typedef double  storage;
+#define LOAD(ts, i) ((ts)[i])
+#define STORE(ts, i, value) ((ts)[i] = (value))
+#elif defined(PRECISION_FP16)
+// Half precision storage with single precision arithmetic, vload_half/vstore_half do not need cl_khr_fp16
+typedef float  real;
+typedef float3 real3;
+typedef float4 real4;
+typedef half   storage;
+#define LOAD(ts, i) vload_half((i), (ts))
+#define STORE(ts, i, value) vstore_half((value), (i), (ts))
+#else
+typedef float  real;
+typedef float3 real3;
+typedef float4 real4;
+typedef float  storage;
+#define LOAD(ts, i) ((ts)[i])
+#define STORE(ts, i, value) ((ts)[i] = (value))
+#endif
+
+// Parameters of simulation, batched simulations have one per member (second dimension of NDRange)
+typedef struct {
+    real s;
+    real r;
+    real dx;
+    real dt;
+    real u;
+    real chi;
+} scheme_params;
+
+#include "_stats.cl"
@@ -0,0 +1,65 @@
+#line 1
+
+// Two-level explicit scheme, expects scheme to define:
+// real stencil(real left, real t, real right, scheme_params p)
+
+__kernel void solve(__global const storage * ts,
+                    __global       storage * ts_res,
+                    __global const scheme_params * params,
+                                   int n
+                    ) {
+    int i = (int) get_global_id(0);
+    int b = (int) get_global_id(1);
+    if (i >= n) {
+        return;
+    }
+
+    ts += (size_t) b * n;
+    ts_res += (size_t) b * n;
+    if (i == 0 || i == n - 1) {
+        STORE(ts_res, i, LOAD(ts, i));
+        return;
+    }
+
+    STORE(ts_res, i, stencil(LOAD(ts, i - 1), LOAD(ts, i), LOAD(ts, i + 1), params[b]));
+}
+
+// Temporal blocking: work-group loads its tile with halo of `steps` cells on each side into local memory
+// and advances all of them by `steps` time steps, so global memory is accessed once per `steps` steps.
+// Halo cells get stale by one cell per step, so only inner get_local_size(0) - 2 * steps cells are written.
+// Tile has storage type and each step is rounded through it, so results are the same as of `steps` launches of solve.
+__kernel void solve_blocked(__global const storage * ts,
+                            __global       storage * ts_res,
+                            __global const scheme_params * params,
+                                           int n,
+                                           int steps,
+                            __local        storage * tile
+                            ) {
+    int local_i = (int) get_local_id(0);
+    int local_size = (int) get_local_size(0);
+    int b = (int) get_global_id(1);
+    int i = (int) get_group_id(0) * (local_size - 2 * steps) - steps + local_i;
+
+    ts += (size_t) b * n;
+    ts_res += (size_t) b * n;
+    scheme_params p = params[b];
+
+    // Borders and cells out of domain are constant
+    bool inner = i > 0 && i < n - 1 && local_i > 0 && local_i < local_size - 1;
+    real t = i >= 0 && i < n ? LOAD(ts, i) : 0;
+    STORE(tile, local_i, t);
+
+    for (int k = 0; k < steps; ++k) {
+        barrier(CLK_LOCAL_MEM_FENCE);
+        if (inner) {
+            t = stencil(LOAD(tile, local_i - 1), t, LOAD(tile, local_i + 1), p);
+        }
+        barrier(CLK_LOCAL_MEM_FENCE);
+        STORE(tile, local_i, t);
+        t = LOAD(tile, local_i);
+    }
+
+    if (local_i >= steps && local_i < local_size - steps && i < n) {
+        STORE(ts_res, i, t);
+    }
+}
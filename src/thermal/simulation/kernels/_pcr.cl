@@ -0,0 +1,81 @@
+#line 1
+
+// Parallel cyclic reduction of tridiagonal system, row i is stored as real4(a, b, c, d):
+// a * x[i - stride] + b * x[i] + c * x[i + stride] = d
+// Each reduction eliminates neighbours at current stride, so after log2(n) reductions x[i] = d / b.
+// Expects scheme to define real3 coefficients(scheme_params p) with (a, b, c) of inner rows.
+
+#define EMPTY_ROW ((real4) (0, 1, 0, 0))
+
+real4 initial_row(__global const storage * ts, int i, scheme_params p, int n) {
+    if (i < 0 || i >= n) {
+        return EMPTY_ROW;
+    }
+    if (i == 0 || i == n - 1) {
+        // Borders are constant
+        return (real4) (0, 1, 0, LOAD(ts, i));
+    }
+    real3 abc = coefficients(p);
+    return (real4) (abc.x, abc.y, abc.z, LOAD(ts, i));
+}
+
+real4 reduce_row(real4 row, real4 left, real4 right) {
+    real k1 = row.x / left.y;
+    real k2 = row.z / right.y;
+    return (real4) (-k1 * left.x,
+                     row.y - k1 * left.z - k2 * right.x,
+                     -k2 * right.z,
+                     row.w - k1 * left.w - k2 * right.w);
+}
+
+__kernel void pcr_init(__global const storage * ts,
+                       __global       real4   * rows,
+                       __global const scheme_params * params,
+                                      int n
+                       ) {
+    int i = (int) get_global_id(0);
+    int b = (int) get_global_id(1);
+    if (i >= n) {
+        return;
+    }
+
+    ts += (size_t) b * n;
+    rows += (size_t) b * n;
+    scheme_params p = params[b];
+    rows[i] = reduce_row(initial_row(ts, i, p, n),
+                         initial_row(ts, i - 1, p, n),
+                         initial_row(ts, i + 1, p, n));
+}
+
+__kernel void pcr_reduce(__global const real4 * rows,
+                         __global       real4 * rows_res,
+                                        int stride,
+                                        int n
+                         ) {
+    int i = (int) get_global_id(0);
+    int b = (int) get_global_id(1);
+    if (i >= n) {
+        return;
+    }
+
+    rows += (size_t) b * n;
+    rows_res += (size_t) b * n;
+    real4 left  = i - stride >= 0 ? rows[i - stride] : EMPTY_ROW;
+    real4 right = i + stride <  n ? rows[i + stride] : EMPTY_ROW;
+    rows_res[i] = reduce_row(rows[i], left, right);
+}
+
+__kernel void pcr_finish(__global const real4   * rows,
+                         __global       storage * ts_res,
+                                        int n
+                         ) {
+    int i = (int) get_global_id(0);
+    int b = (int) get_global_id(1);
+    if (i >= n) {
+        return;
+    }
+
+    rows += (size_t) b * n;
+    ts_res += (size_t) b * n;
+    STORE(ts_res, i, rows[i].w / rows[i].y);
+}
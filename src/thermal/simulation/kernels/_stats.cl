@@ -0,0 +1,57 @@
+#line 1
+
+// Residual between previous and current states and diagnostics of current state in one pass over cells
+// [from_i, to_i) of each batch member, values are reduced per work-group into
+// partial_stats[(b * get_num_groups(0) + group) * STATS_COUNT + k], where k is index of:
+#define STATS_COUNT 5
+// max |ts - ts_prev|, sum (ts - ts_prev)^2, sum ts, min ts, max ts
+// Work-group size should be a power of two.
+
+__kernel void stats(__global const storage * ts,
+                    __global const storage * ts_prev,
+                    __global       real * partial_stats,
+                                   int n,
+                                   int from_i,
+                                   int to_i,
+                    __local        real * scratch
+                    ) {
+    int local_i = (int) get_local_id(0);
+    int local_size = (int) get_local_size(0);
+    int b = (int) get_global_id(1);
+
+    ts += (size_t) b * n;
+    ts_prev += (size_t) b * n;
+    real values[STATS_COUNT] = {0, 0, 0, INFINITY, -INFINITY};
+    for (int i = from_i + (int) get_global_id(0); i < to_i; i += (int) get_global_size(0)) {
+        real t = LOAD(ts, i);
+        real diff = t - LOAD(ts_prev, i);
+        values[0] = fmax(values[0], fabs(diff));
+        values[1] += diff * diff;
+        values[2] += t;
+        values[3] = fmin(values[3], t);
+        values[4] = fmax(values[4], t);
+    }
+
+    for (int k = 0; k < STATS_COUNT; ++k) {
+        scratch[k * local_size + local_i] = values[k];
+    }
+    for (int stride = local_size / 2; stride > 0; stride /= 2) {
+        barrier(CLK_LOCAL_MEM_FENCE);
+        if (local_i < stride) {
+            __local real * value = scratch + local_i;
+            __local real * other = scratch + local_i + stride;
+            value[0]              = fmax(value[0], other[0]);
+            value[local_size]     += other[local_size];
+            value[2 * local_size] += other[2 * local_size];
+            value[3 * local_size] = fmin(value[3 * local_size], other[3 * local_size]);
+            value[4 * local_size] = fmax(value[4 * local_size], other[4 * local_size]);
+        }
+    }
+
+    if (local_i == 0) {
+        partial_stats += ((size_t) b * get_num_groups(0) + get_group_id(0)) * STATS_COUNT;
+        for (int k = 0; k < STATS_COUNT; ++k) {
+            partial_stats[k] = scratch[k * local_size];
+        }
+    }
+}
@@ -0,0 +1,24 @@
+import numpy as np
+
+
+def apply_three_point(ts, ts_res, left, center, right, tmp):
+    # Batched simulations are rows of ts, and then coefficients are columns of per-member values
+    inner = ts_res[..., 1:-1]
+    np.multiply(ts[..., 1:-1], center, out=inner)
+    np.multiply(ts[..., :-2], left, out=tmp)
+    inner += tmp
+    np.multiply(ts[..., 2:], right, out=tmp)
+    inner += tmp
+
+
+def solve_three_point(ts, left, center, right, iters):
+    ts = np.array(ts, np.result_type(ts, np.float32))
+    ts_res = ts.copy()
+    tmp = np.empty(ts[..., 1:-1].shape, ts.dtype)
+
+    # Borders are constant and both buffers already hold them, so only inner cells are updated
+    for i in range(iters):
+        apply_three_point(ts, ts_res, left, center, right, tmp)
+        ts, ts_res = ts_res, ts
+
+    return ts
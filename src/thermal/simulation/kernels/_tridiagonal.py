@@ -0,0 +1,63 @@
+import numpy as np
+from scipy.linalg import lapack
+
+from thermal.utils import support
+
+# Factorizations are kept per method for this many (n, s, r, dtype) combinations
+CACHE_SIZE = 16
+
+
+class TridiagonalFactorization:
+
+    def __init__(self, lower_diag, diag, upper_diag):
+        gttrf, self._gttrs = lapack.get_lapack_funcs(('gttrf', 'gttrs'), (diag,))
+        *factors, info = gttrf(lower_diag, diag, upper_diag)
+        if info != 0:
+            raise Exception('Tridiagonal matrix is singular!')
+        self._factors = tuple(factors)
+
+    def solve(self, ts, overwrite=False):
+        ts, info = self._gttrs(*(self._factors + (ts,)), overwrite_b=overwrite)
+        if info != 0:
+            raise Exception('Tridiagonal system can not be solved (LAPACK gttrs info={})!'.format(info))
+        return ts
+
+
+def build_diagonals(n, lower, diag, upper, dtype):
+    lower_diag = support.np_the_same(n - 1, lower, dtype)
+    diag = support.np_the_same(n, diag, dtype)
+    upper_diag = support.np_the_same(n - 1, upper, dtype)
+
+    # Borders are constant
+    upper_diag[0] = 0
+    diag[[0, -1]] = 1
+    lower_diag[-1] = 0
+    return lower_diag, diag, upper_diag
+
+
+def factorize(n, lower, diag, upper, dtype):
+    return TridiagonalFactorization(*build_diagonals(n, lower, diag, upper, dtype))
+
+
+def solve(factorization, ts, iters):
+    for i in range(iters):
+        ts = factorization.solve(ts, overwrite=True)
+    return ts
+
+
+def solve_grouped(factorize, ts, s, r, iters):
+    ts = np.array(ts, np.result_type(ts, np.float32))
+    if ts.ndim == 1:
+        return solve(factorize(len(ts), s, r, ts.dtype), ts, iters)
+
+    # Batch members with the same matrix are solved together as columns of one multi-RHS system
+    batch, n = ts.shape
+    members_by_params = {}
+    for member, params in enumerate(zip(np.broadcast_to(s, (batch, 1)).ravel(),
+                                        np.broadcast_to(r, (batch, 1)).ravel())):
+        members_by_params.setdefault(params, []).append(member)
+
+    for (s, r), members in members_by_params.items():
+        factorization = factorize(n, float(s), float(r), ts.dtype)
+        ts[members] = solve(factorization, np.asfortranarray(ts[members].T), iters).T
+    return ts
@@ -1,20 +1,9 @@
 #line 1
 
-__kernel void solve(__global const float * ts,
-                    __global       float * ts_res,
-                                   float s,
-                                   float r,
-                                   float dx,
-                                   float dt,
-                                   float u,
-                                   float chi,
-                                   int n
-                    ) {
-    int i = (int) get_global_id(0);
-    if (i == 0 || i == n - 1) {
-        ts_res[i] = ts[i];
-        return;
-    }
+#include "_common.cl"
 
-    ts_res[i] = ts[i] * (1 + s - 2 * r) + (r - s) * ts[i + 1] + r * ts[i - 1];
+real stencil(real left, real t, real right, scheme_params p) {
+    return t * (1 + p.s - 2 * p.r) + (p.r - p.s) * right + p.r * left;
 }
+
+#include "_explicit.cl"
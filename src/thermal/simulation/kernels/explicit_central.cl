@@ -1,20 +1,9 @@
 #line 1
 
-__kernel void solve(__global const float * ts,
-                    __global       float * ts_res,
-                                   float s,
-                                   float r,
-                                   float dx,
-                                   float dt,
-                                   float u,
-                                   float chi,
-                                   int n
-                    ) {
-    int i = (int) get_global_id(0);
-    if (i == 0 || i == n - 1) {
-        ts_res[i] = ts[i];
-        return;
-    }
+#include "_common.cl"
 
-    ts_res[i] = ts[i] * (1 - 2 * r) + (r - s / 2.0f) * ts[i + 1] + (r + s / 2.0f) * ts[i - 1];
+real stencil(real left, real t, real right, scheme_params p) {
+    return t * (1 - 2 * p.r) + (p.r - p.s / 2) * right + (p.r + p.s / 2) * left;
 }
+
+#include "_explicit.cl"
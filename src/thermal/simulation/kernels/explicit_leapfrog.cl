@@ -1,43 +1,54 @@
 #line 1
 
-__kernel void init(__global const float * ts,
-                    __global       float * ts_res,
-                                   float s,
-                                   float r,
-                                   float dx,
-                                   float dt,
-                                   float u,
-                                   float chi,
-                                   int n
-                    ) {
+#include "_common.cl"
+
+__kernel void init(__global const storage * ts,
+                   __global       storage * ts_res,
+                   __global const scheme_params * params,
+                                  int n
+                   ) {
     int i = (int) get_global_id(0);
+    int b = (int) get_global_id(1);
+    if (i >= n) {
+        return;
+    }
+
+    ts += (size_t) b * n;
+    ts_res += (size_t) b * n;
     if (i == 0 || i == n - 1) {
-        ts_res[i] = ts[i];
+        STORE(ts_res, i, LOAD(ts, i));
         return;
     }
 
     // Iteration #0 as in explicit central scheme:
-    ts_res[i] = ts[i] * (1 - 2 * r) + (r - s / 2.0f) * ts[i + 1] + (r + s / 2.0f) * ts[i - 1];
+    scheme_params p = params[b];
+    STORE(ts_res, i, LOAD(ts, i) * (1 - 2 * p.r)
+                     + (p.r - p.s / 2) * LOAD(ts, i + 1) + (p.r + p.s / 2) * LOAD(ts, i - 1));
 }
 
 
-__kernel void solve(__global const float * ts_prev,
-                    __global const float * ts,
-                    __global       float * ts_res,
-                                   float s,
-                                   float r,
-                                   float dx,
-                                   float dt,
-                                   float u,
-                                   float chi,
+__kernel void solve(__global const storage * ts_prev,
+                    __global const storage * ts,
+                    __global       storage * ts_res,
+                    __global const scheme_params * params,
                                    int n
                     ) {
     int i = (int) get_global_id(0);
+    int b = (int) get_global_id(1);
+    if (i >= n) {
+        return;
+    }
+
+    ts_prev += (size_t) b * n;
+    ts += (size_t) b * n;
+    ts_res += (size_t) b * n;
     if (i == 0 || i == n - 1) {
-        ts_res[i] = ts[i];
+        STORE(ts_res, i, LOAD(ts, i));
         return;
     }
 
-    float ts_i_prev = ts_prev[i];
-    ts_res[i] = ts_i_prev - ts[i] * 4 * r + (2 * r - s) * ts[i + 1] + (2 * r + s) * ts[i - 1];
+    scheme_params p = params[b];
+    real ts_i_prev = LOAD(ts_prev, i);
+    STORE(ts_res, i, ts_i_prev - LOAD(ts, i) * 4 * p.r
+                     + (2 * p.r - p.s) * LOAD(ts, i + 1) + (2 * p.r + p.s) * LOAD(ts, i - 1));
 }
@@ -0,0 +1,26 @@
+import numpy as np
+
+from thermal.simulation.kernels import _stencil
+
+
+def solve_levels(ts_prev, ts, s, r, dx, dt, u, chi, iters):
+    ts_prev, ts = ts_prev.copy(), ts.copy()
+    ts_res = ts.copy()
+    tmp = np.empty(ts[..., 1:-1].shape, ts.dtype)
+
+    for i in range(iters):
+        _stencil.apply_three_point(ts, ts_res, 2 * r + s, -4 * r, 2 * r - s, tmp)
+        ts_res[..., 1:-1] += ts_prev[..., 1:-1]
+        ts_prev, ts, ts_res = ts, ts_res, ts_prev
+
+    return ts_prev, ts
+
+
+def solve(ts, s, r, dx, dt, u, chi, iters):
+    if iters == 0:
+        return np.array(ts, np.result_type(ts, np.float32))
+
+    # Iteration #0 as in explicit central scheme:
+    ts_prev = np.array(ts, np.result_type(ts, np.float32))
+    ts = _stencil.solve_three_point(ts_prev, r + s / 2, 1 - 2 * r, r - s / 2, 1)
+    return solve_levels(ts_prev, ts, s, r, dx, dt, u, chi, iters - 1)[1]
@@ -0,0 +1,19 @@
+#line 1
+
+// Parameters of simulation on grid, values per axis: x - the last axis of ts, z - the first axis of 3-D ts,
+// axes absent in 2-D grids have zero values
+typedef struct {
+    real s_x;
+    real s_y;
+    real s_z;
+    real r_x;
+    real r_y;
+    real r_z;
+} grid_params;
+
+// Cells on faces of grid are constant, axes of size 1 have no faces
+bool is_border(int x, int y, int z, int nx, int ny, int nz) {
+    return (nx > 1 && (x == 0 || x == nx - 1))
+        || (ny > 1 && (y == 0 || y == ny - 1))
+        || (nz > 1 && (z == 0 || z == nz - 1));
+}
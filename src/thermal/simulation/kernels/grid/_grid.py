@@ -0,0 +1,3 @@
+def axis_slices(shape, axis, axis_slice):
+    # Inner cells of grid (axes of size 1 have no borders) shifted along axis
+    return tuple(axis_slice if i == axis else (slice(1, -1) if n > 1 else slice(None)) for i, n in enumerate(shape))
@@ -0,0 +1,88 @@
+#line 1
+
+// Two-level explicit scheme on 2-D or 3-D grid, expects scheme to define:
+// real grid_stencil(real t, real3 left, real3 right, grid_params p)
+// where left and right are neighbours along axes x, y and z (neighbours along absent axes are equal to t)
+
+__kernel void solve(__global const storage * ts,
+                    __global       storage * ts_res,
+                    __global const grid_params * params,
+                                   int nx,
+                                   int ny,
+                                   int nz
+                    ) {
+    int x = (int) get_global_id(0);
+    int y = (int) get_global_id(1);
+    int z = (int) get_global_id(2);
+    if (x >= nx || y >= ny || z >= nz) {
+        return;
+    }
+
+    size_t i = ((size_t) z * ny + y) * nx + x;
+    size_t plane = (size_t) nx * ny;
+    real t = LOAD(ts, i);
+    if (is_border(x, y, z, nx, ny, nz)) {
+        STORE(ts_res, i, t);
+        return;
+    }
+
+    real3 left  = (real3) (nx > 1 ? LOAD(ts, i - 1) : t,
+                           ny > 1 ? LOAD(ts, i - nx) : t,
+                           nz > 1 ? LOAD(ts, i - plane) : t);
+    real3 right = (real3) (nx > 1 ? LOAD(ts, i + 1) : t,
+                           ny > 1 ? LOAD(ts, i + nx) : t,
+                           nz > 1 ? LOAD(ts, i + plane) : t);
+    STORE(ts_res, i, grid_stencil(t, left, right, params[0]));
+}
+
+// Work-group loads its XY tile with halo of one cell on each side into local memory once,
+// so each cell of the plane is read from global memory about once instead of five times.
+// Neighbours along z are read from global memory.
+__kernel void solve_tiled(__global const storage * ts,
+                          __global       storage * ts_res,
+                          __global const grid_params * params,
+                                         int nx,
+                                         int ny,
+                                         int nz,
+                          __local        real * tile
+                          ) {
+    int local_x = (int) get_local_id(0);
+    int local_y = (int) get_local_id(1);
+    int tile_nx = (int) get_local_size(0) + 2;
+    int tile_ny = (int) get_local_size(1) + 2;
+    int x = (int) get_global_id(0);
+    int y = (int) get_global_id(1);
+    int z = (int) get_global_id(2);
+
+    size_t plane = (size_t) nx * ny;
+    int tile_x0 = (int) (get_group_id(0) * get_local_size(0)) - 1;
+    int tile_y0 = (int) (get_group_id(1) * get_local_size(1)) - 1;
+    for (int j = local_y * (int) get_local_size(0) + local_x; j < tile_nx * tile_ny;
+         j += (int) (get_local_size(0) * get_local_size(1))) {
+        int tile_x = tile_x0 + j % tile_nx;
+        int tile_y = tile_y0 + j / tile_nx;
+        tile[j] = tile_x >= 0 && tile_x < nx && tile_y >= 0 && tile_y < ny
+                  ? LOAD(ts, z * plane + (size_t) tile_y * nx + tile_x) : 0;
+    }
+    barrier(CLK_LOCAL_MEM_FENCE);
+
+    if (x >= nx || y >= ny) {
+        return;
+    }
+
+    size_t i = z * plane + (size_t) y * nx + x;
+    int c = (local_y + 1) * tile_nx + local_x + 1;
+    real t = tile[c];
+    if (is_border(x, y, z, nx, ny, nz)) {
+        STORE(ts_res, i, t);
+        return;
+    }
+
+    real3 left  = (real3) (nx > 1 ? tile[c - 1] : t,
+                           ny > 1 ? tile[c - tile_nx] : t,
+                           nz > 1 ? LOAD(ts, i - plane) : t);
+    real3 right = (real3) (nx > 1 ? tile[c + 1] : t,
+                           ny > 1 ? tile[c + tile_nx] : t,
+                           nz > 1 ? LOAD(ts, i + plane) : t);
+    STORE(ts_res, i, grid_stencil(t, left, right, params[0]));
+}
@@ -0,0 +1,13 @@
+#line 1
+
+#include "../_common.cl"
+#include "_grid.cl"
+
+// 5-point (2-D) or 7-point (3-D) central scheme, the sum of 1-D central schemes along each axis
+real grid_stencil(real t, real3 left, real3 right, grid_params p) {
+    real3 s = (real3) (p.s_x, p.s_y, p.s_z);
+    real3 r = (real3) (p.r_x, p.r_y, p.r_z);
+    return t * (1 - 2 * (r.x + r.y + r.z)) + dot(r - s / 2, right) + dot(r + s / 2, left);
+}
+
+#include "_grid_explicit.cl"
@@ -0,0 +1,24 @@
+import numpy as np
+
+from thermal.simulation.kernels.grid import _grid
+
+
+def solve(ts, s, r, iters):
+    ts = np.array(ts, np.result_type(ts, np.float32))
+    ts_res = ts.copy()
+    inner = _grid.axis_slices(ts.shape, None, None)
+    axes = [axis for axis, n in enumerate(ts.shape) if n > 1]
+    tmp = np.empty(ts[inner].shape, ts.dtype)
+
+    # Borders are constant and both buffers already hold them, so only inner cells are updated
+    for i in range(iters):
+        res = ts_res[inner]
+        np.multiply(ts[inner], 1 - 2 * sum(r[axis] for axis in axes), out=res)
+        for axis in axes:
+            np.multiply(ts[_grid.axis_slices(ts.shape, axis, slice(None, -2))], r[axis] + s[axis] / 2, out=tmp)
+            res += tmp
+            np.multiply(ts[_grid.axis_slices(ts.shape, axis, slice(2, None))], r[axis] - s[axis] / 2, out=tmp)
+            res += tmp
+        ts, ts_res = ts_res, ts
+
+    return ts
@@ -0,0 +1,43 @@
+import numpy as np
+
+from thermal.simulation.kernels import implicit_central
+from thermal.simulation.kernels.grid import _grid
+
+
+def _increment(ts, axis, s, r):
+    # D t on inner cells, where D is central difference operator along axis: explicit step is t + D t
+    res = ts[_grid.axis_slices(ts.shape, None, None)] * (-2 * r)
+    res += ts[_grid.axis_slices(ts.shape, axis, slice(None, -2))] * (r + s / 2)
+    res += ts[_grid.axis_slices(ts.shape, axis, slice(2, None))] * (r - s / 2)
+    return res
+
+
+def _solve_lines(ts, axis, s, r):
+    # Solves (I - D) t' = t along axis, lines along the axis are columns of one multi-RHS tridiagonal system
+    n = ts.shape[axis]
+    factorization = implicit_central.factorize(n, s, r, ts.dtype)
+    # Lines on faces of other axes are borders, so they are not solved
+    lines = tuple(slice(None) if other == axis else (slice(1, -1) if size > 1 else slice(None))
+                  for other, size in enumerate(ts.shape))
+    rhs = np.moveaxis(ts[lines], axis, 0)
+    shape = rhs.shape
+    rhs = np.asfortranarray(rhs.reshape(n, -1))
+    ts[lines] = np.moveaxis(factorization.solve(rhs, overwrite=True).reshape(shape), 0, axis)
+
+
+def solve(ts, s, r, iters):
+    # Douglas alternating direction implicit scheme with theta = 1/2 (second order in time, unconditionally
+    # stable for diffusion in 2-D and 3-D): y = t + sum of D_k t, then for each axis k in turn
+    # (I - D_k / 2) y' = y - D_k t / 2, where D_k is central difference operator along axis k, and t' = y
+    ts = np.array(ts, np.result_type(ts, np.float32))
+    inner = _grid.axis_slices(ts.shape, None, None)
+    axes = [axis for axis, n in enumerate(ts.shape) if n > 1]
+    for i in range(iters):
+        increments = [_increment(ts, axis, float(s[axis]), float(r[axis])) for axis in axes]
+        ys = ts.copy()
+        ys[inner] += sum(increments)
+        for axis, increment in zip(axes, increments):
+            ys[inner] -= increment / 2
+            _solve_lines(ys, axis, float(s[axis]) / 2, float(r[axis]) / 2)
+        ts = ys
+    return ts
@@ -1,24 +1,12 @@
-import numpy as np
-from scipy.linalg import solve_banded
+import functools
 
-from thermal.utils import support
+from thermal.simulation.kernels import _tridiagonal
 
 
-def solve(ts, s, r, dx, dt, u, chi, iters):
-    n = len(ts)
-
-    lower_diag = support.np_the_same(n, -(r + s / 2), np.float32)
-    diag = support.np_the_same(n, (1 + 2 * r), np.float32)
-    upper_diag = support.np_the_same(n, -(r - s / 2), np.float32)
-
-    # Out of bounds values should be zero, and borders are constant
-    upper_diag[[0, 1]] = 0
-    diag[[0, -1]] = 1
-    lower_diag[[-1, -2]] = 0
+@functools.lru_cache(maxsize=_tridiagonal.CACHE_SIZE)
+def factorize(n, s, r, dtype):
+    return _tridiagonal.factorize(n, -(r + s / 2), 1 + 2 * r, -(r - s / 2), dtype)
 
-    diags = np.array([upper_diag, diag, lower_diag])
 
-    for i in range(iters):
-        ts = solve_banded((1, 1), diags, ts)
-
-    return ts
+def solve(ts, s, r, dx, dt, u, chi, iters):
+    return _tridiagonal.solve_grouped(factorize, ts, s, r, iters)
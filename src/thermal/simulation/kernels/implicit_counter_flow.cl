@@ -0,0 +1,10 @@
+#line 1
+
+#include "_common.cl"
+
+// Row of implicit scheme: a * ts_res[i - 1] + b * ts_res[i] + c * ts_res[i + 1] = ts[i]
+real3 coefficients(scheme_params p) {
+    return (real3) (-(p.s + p.r), 1 + p.s + 2 * p.r, -p.r);
+}
+
+#include "_pcr.cl"
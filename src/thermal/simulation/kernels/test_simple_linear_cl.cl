@@ -1,20 +1,9 @@
 #line 1
 
-__kernel void solve(__global const float * ts,
-                    __global       float * ts_res,
-                                   float s,
-                                   float r,
-                                   float dx,
-                                   float dt,
-                                   float u,
-                                   float chi,
-                                   int n
-                    ) {
-    int i = (int) get_global_id(0);
-    if (i == 0 || i == n - 1) {
-        ts_res[i] = ts[i];
-        return;
-    }
+#include "_common.cl"
 
-    ts_res[i] = (u * ts[i - 1] + ts[i] + u * ts[i + 1]) / (u + 1 + u);
+real stencil(real left, real t, real right, scheme_params p) {
+    return (p.u * left + t + p.u * right) / (p.u + 1 + p.u);
 }
+
+#include "_explicit.cl"
@@ -3,122 +3,335 @@
 # All rights reserved.
 #
 
-import sys
+import re
 import logging
-import itertools
+import hashlib
+import functools
 import numpy as np
-import pkg_resources
-import pyopencl as cl
-import pyopencl.array
 from pathlib import Path
 from importlib import import_module
 
-from thermal.utils.cl import create_context
+from thermal.simulation import stability
+from thermal.simulation.session import PySession, GridPySession, PRECISIONS
+
+# OpenCL modules (pyopencl, thermal.utils.cl, thermal.simulation.cl_session) are imported on first use of OpenCL,
+# SciPy - on first use of Python kernels that need it
 
 logger = logging.getLogger(__name__)
 
-kernels_path = Path(pkg_resources.get_provider('thermal.simulation.kernels').get_resource_filename(__name__, '.'))
+
+@functools.lru_cache()
+def get_kernels_path(package='thermal.simulation.kernels'):
+    # Directory of the package (unlike pkg_resources, import of the package is cheap)
+    return Path(import_module(package).__file__).parent
+
+
+def read_cl_source(path: Path):
+    # Expands '#include "<file>"' textually, so every program is built from one self-contained source
+    lines = []
+    with path.open() as f:
+        for line_num, line in enumerate(f, 1):
+            include = re.match(r'\s*#include\s+"(.+)"', line)
+            if include is None:
+                lines.append(line)
+            else:
+                lines.append(read_cl_source(path.parent / include.group(1)))
+                lines.append('#line {}\n'.format(line_num + 1))
+    return ''.join(lines)
+
+
+def get_kernel_modules(module, root_package='thermal.simulation.kernels'):
+    # Module and kernel modules it imports (i.e. private helpers and kernels of other methods), recursively
+    modules = {}
+    pending = [module]
+    while pending:
+        module = pending.pop()
+        if module.__name__ in modules:
+            continue
+        modules[module.__name__] = module
+        pending.extend(value for value in vars(module).values()
+                       if isinstance(value, type(module)) and value.__name__.startswith(root_package + '.'))
+    return [modules[name] for name in sorted(modules)]
 
 
 class SimulationProcessor:
+    # Package with kernels of methods: <name>.cl for OpenCL backend and <name>.py for Python backend
+    kernels_package = 'thermal.simulation.kernels'
+    # Backends of methods without explicit backend by prefix of name, other methods prefer OpenCL.
+    # Implicit methods keep LAPACK solver (with pivoting), OpenCL PCR solver is used only as '<name>@cl'
+    default_backends = {'implicit_': 'py'}
 
-    def __init__(self, cl_context: cl.Context=None, kernels_cache_dir=None):
+    def __init__(self, cl_context: 'pyopencl.Context'=None, kernels_cache_dir=None, block_steps=None,
+                 parts=None, exchange_steps=16, precision='fp32', stability_mode='off'):
+        if precision not in PRECISIONS:
+            raise KeyError('Unknown precision: {}!'.format(precision))
+        if stability_mode not in stability.MODES:
+            raise KeyError('Unknown stability mode: {}!'.format(stability_mode))
         self._context = cl_context
+        # Why OpenCL backend can not be used or None
+        self._cl_unavailable = None
+        self._cl_sources = None
+        self._py_names = None
         self._cl_methods = {}
         self._py_methods = {}
+        # On-disk cache of built programs: None - default directory, False - disabled
         self._kernels_cache_dir = kernels_cache_dir
+        # Steps per launch of temporal blocking kernels: None - chosen by device, 1 - disabled
+        self._block_steps = block_steps
+        # Domain decomposition of explicit schemes: None - one part per device of context, 1 - disabled
+        self._parts = parts
+        self._exchange_steps = exchange_steps
+        # One of PRECISIONS: fp32, fp64 or fp16 (half precision storage with single precision arithmetic)
+        self.precision = precision
+        # What to do with explicit methods unstable for given s and r, one of stability.MODES
+        self.stability_mode = stability_mode
 
         self.compiled = False
 
-    def compile(self):
-        self._context = self._context or create_context()
-        logger.debug('Compiling OpenCL kernels for SimulationProcessor...')
+    def _detect_methods(self):
+        if self._cl_sources is not None:
+            return
 
+        self._cl_sources, self._py_names = {}, set()
+        kernels_path = get_kernels_path(self.kernels_package)
         for cl_file in kernels_path.glob("*.cl"):
-            name = cl_file.name.split(".")[0]
-            with cl_file.open() as f:
-                source_code = f.readlines()
+            if not cl_file.name.startswith("_"):
+                self._cl_sources[cl_file.name.split(".")[0]] = cl_file
+        for py_file in kernels_path.glob("*.py"):
+            if not py_file.name.startswith("_"):
+                self._py_names.add(py_file.name.split(".")[0])
 
-            logger.debug('Building kernels for \'{}\'...'.format(name))
-            self._cl_methods[name] = cl.Program(self._context, ''.join(source_code)).build(
-                cache_dir=self._kernels_cache_dir)
-        logger.debug('OpenCL kernels for SimulationProcessor compiled: {}!'.format(sorted(self._cl_methods.keys())))
+    def _get_context(self):
+        if self._context is None and self._cl_unavailable is None:
+            try:
+                from thermal.utils.cl import create_context
+                self._context = create_context()
+            except Exception as e:
+                self._cl_unavailable = 'OpenCL is unavailable ({})'.format(e)
+                logger.warning('{}, only Python kernels will be used!'.format(self._cl_unavailable))
+        if self._context is not None and self._cl_unavailable is None:
+            from thermal.simulation.cl_session import supports_precision
+            if not supports_precision(self._context, self.precision):
+                self._cl_unavailable = 'OpenCL devices do not support {}'.format(self.precision)
+                logger.warning('{}, only Python kernels will be used!'.format(self._cl_unavailable))
+        return None if self._cl_unavailable is not None else self._context
 
-        for py_file in kernels_path.glob("*.py"):
-            if py_file.name.startswith("_"):
-                continue
+    def _get_cl_method(self, name):
+        if name not in self._cl_methods:
+            from thermal.utils.cl import build_program
+            from thermal.simulation.cl_session import PRECISION_BUILD_OPTIONS
+            logger.debug('Building kernels for \'{}\' ({})...'.format(name, self.precision))
+            source_code = read_cl_source(self._cl_sources[name])
+            self._cl_methods[name] = build_program(self._get_context(), source_code,
+                                                   PRECISION_BUILD_OPTIONS[self.precision],
+                                                   cache_dir=self._kernels_cache_dir)
+        return self._cl_methods[name]
 
-            name = py_file.name.split('.')[0]
-            package = sys.modules[__name__]
-            kernel_module = import_module('..kernels.{}'.format(name), package.__name__)
-            solve = getattr(kernel_module, 'solve')
-            self._py_methods[name] = solve
-        logger.debug('Python kernels for SimulationProcessor imported: {}!'.format(sorted(self._py_methods.keys())))
+    def _get_py_method(self, name):
+        if name not in self._py_methods:
+            kernel_module = import_module('{}.{}'.format(self.kernels_package, name))
+            assert hasattr(kernel_module, 'solve')
+            self._py_methods[name] = kernel_module
+        return self._py_methods[name]
 
-        for name in self._cl_methods.keys():
-            assert name not in self._py_methods.keys()
-        for name in self._py_methods.keys():
-            assert name not in self._cl_methods.keys()
+    def prepare(self, method_name):
+        # Builds or imports kernels of the method, so that the first run does not pay for it
+        self._resolve_method(method_name)
+
+    def get_kernels_version(self, method_name):
+        # Hash of sources of kernels of the method, so that results of changed kernels are told apart
+        name = method_name.partition('@')[0]
+        backend, method = self._resolve_method(method_name)
+        if backend == 'cl':
+            source = read_cl_source(self._cl_sources[name])
+        else:
+            # Python kernels use private helper modules of the package and may import modules of other packages
+            paths = {Path(module.__file__) for module in get_kernel_modules(method)}
+            paths = sorted(paths | set(get_kernels_path(self.kernels_package).glob('_*.py')))
+            source = ''
+            for path in paths:
+                with path.open() as f:
+                    source += f.read()
+        return '{}:{}'.format(backend, hashlib.sha1(source.encode()).hexdigest())
+
+    def compile(self):
+        for backend, names, get_method in self._get_backends():
+            for name in names:
+                get_method(name)
+        logger.debug('Kernels for SimulationProcessor prepared: OpenCL {}, Python {}!'.format(
+            sorted(self._cl_methods.keys()), sorted(self._py_methods.keys())))
 
         self.compiled = True
 
-    def process(self, ts,
-                *, dx, dt, u, chi, s=None, r=None,
-                iters=1, method_name: str) -> cl.array.Array:
-        n, iter_dt = len(ts), dt / iters
+    def _get_backends(self):
+        # In order of preference, each backend is (name, its method names, method getter)
+        self._detect_methods()
+        cl_names = self._cl_sources.keys() if self._get_context() is not None else []
+        return [('cl', cl_names, self._get_cl_method), ('py', self._py_names, self._get_py_method)]
+
+    def _resolve_method(self, method_name):
+        # Method name is '<name>' or '<name>@<backend>', without backend see default_backends
+        self._detect_methods()
+        name, _, backend = method_name.partition('@')
+        if not backend:
+            backends = self.get_backend_names(name)
+            if len(backends) == 0:
+                raise KeyError('Unknown method: {}!'.format(method_name))
+            backend = backends[0]
+            for prefix, default_backend in self.default_backends.items():
+                if name.startswith(prefix) and default_backend in backends:
+                    backend = default_backend
+        elif backend == 'cl' and self._get_context() is None and name in self._cl_sources:
+            # Explicitly requested OpenCL kernels never silently fall back to Python ones
+            raise Exception('Method {} can not be used: {}!'.format(method_name, self._cl_unavailable))
+
+        backends = {backend: (names, get_method) for backend, names, get_method in self._get_backends()}
+        if backend not in backends:
+            raise KeyError('Unknown backend: {} (from method_name={})!'.format(backend, method_name))
+        names, get_method = backends[backend]
+        if name not in names:
+            raise KeyError('Method {} has no {} backend!'.format(name, backend))
+        return backend, get_method(name)
+
+    @staticmethod
+    def _resolve_s_r(dx, dt, u, chi, s, r):
         if s is None:
             s = u * dt / dx
             logger.debug('s = {}\t= u * dt / dx'.format(s))
         if r is None:
             r = chi * dt / (dx * dx)
             logger.debug('r = {}\t= chi * dt / dx^2'.format(r))
+        return s, r
 
-        if method_name in self._py_methods:
-            solve = self._py_methods[method_name]
-            ts_res = solve(ts, s, r, dx, dt / iters, u, chi, iters)
-            return ts_res
+    def _check_stability(self, method_name, s, r):
+        # Returns method name and number of sub-steps to use instead of given method
+        if self.stability_mode == 'off':
+            return method_name, 1
+        name, _, backend = method_name.partition('@')
+        substeps = stability.choose_substeps(name, s, r)
+        if substeps == 1:
+            return method_name, 1
 
-        if not self.compiled:
-            self.compile()
+        if self.stability_mode == 'auto' and substeps is not None:
+            logger.info('Method {} is unstable with s={} and r={}, each step is split into {} sub-steps'.format(
+                method_name, s, r, substeps))
+            return method_name, substeps
+        if self.stability_mode == 'implicit' and name in stability.IMPLICIT_COUNTERPARTS:
+            implicit_name = stability.IMPLICIT_COUNTERPARTS[name] + ('@' + backend if backend else '')
+            logger.info('Method {} is unstable with s={} and r={}, {} is used instead'.format(
+                method_name, s, r, implicit_name))
+            return implicit_name, 1
+        raise stability.UnstableMethodError('Method {} is unstable with s={} and r={}!'.format(method_name, s, r))
 
-        program = self._cl_methods[method_name]
-        queue = cl.CommandQueue(self._context)
+    def check_stability(self, method_name, *, dx, dt, u, chi, s=None, r=None):
+        # Method name and number of sub-steps that open_session uses with these parameters (see stability_mode)
+        s, r = self._resolve_s_r(dx, dt, u, chi, s, r)
+        return self._check_stability(method_name, s, r)
 
-        s, r, dx, dt, iter_dt, u, chi = map(np.float32, [s, r, dx, dt, iter_dt, u, chi])
-        iters, n = map(np.int32, [iters, n])
+    def open_session(self, ts,
+                     *, dx, dt, u, chi, s=None, r=None,
+                     iters=1, method_name: str):
+        if np.ndim(ts) == 2:
+            dx, dt, u, chi = map(np.asarray, [dx, dt, u, chi])
+        s, r = self._resolve_s_r(dx, dt, u, chi, s, r)
+        method_name, substeps = self._check_stability(method_name, s, r)
+        s, r = np.divide(s, substeps), np.divide(r, substeps)
+        return self.create_session(ts, method_name, s=s, r=r, dx=dx, dt=dt, u=u, chi=chi, iters=iters,
+                                   precision=self.precision, substeps=substeps)
 
-        iter_dt = np.float32(dt / iters)
+    def create_session(self, ts, method_name, **params):
+        # Session with already resolved parameters (as in SimulationSession.params), i.e. restored from checkpoint
+        backend, method = self._resolve_method(method_name)
+        if backend == 'py':
+            return PySession(method, ts, method_name, **params)
 
-        if isinstance(ts, cl.array.Array):
-            ts_cl = ts
-        else:
-            ts = np.float32(ts)
-            ts_cl = cl.array.to_device(queue, ts)
-        ts_res_cl = cl.array.zeros(queue, n, np.float32)
-
-        if method_name == 'explicit_leapfrog':
-            program.init(queue, (n,), None,
-                         ts_cl.data, ts_res_cl.data,
-                         s, r, dx, iter_dt, u, chi,
-                         n)
-            ts_prev_cl, ts_cl = ts_cl.copy(), ts_res_cl
-            for i in range(iters):
-                program.solve(queue, (n,), None,
-                              ts_prev_cl.data, ts_cl.data, ts_res_cl.data,
-                              s, r, dx, iter_dt, u, chi,
-                              n)
-                ts_prev_cl, ts_cl, ts_res_cl = ts_cl, ts_res_cl, ts_prev_cl
-        else:
-            program.solve(queue, (n,), None,
-                          ts_cl.data, ts_res_cl.data,
-                          s, r, dx, iter_dt, u, chi,
-                          n)
+        import pyopencl.array
+        from thermal.simulation.cl_session import ClSession, DecomposedClSession
+        parts = self._parts or len(self._context.devices)
+        if parts > 1 and DecomposedClSession.supports(method) and not isinstance(ts, pyopencl.array.Array):
+            return DecomposedClSession(self._context, method, ts, method_name, parts=parts,
+                                       exchange_steps=self._exchange_steps, block_steps=self._block_steps, **params)
+        return ClSession(self._context, method, ts, method_name, block_steps=self._block_steps, **params)
 
-        ts_res = ts_res_cl.get()
-        return ts_res
+    def process(self, ts,
+                *, dx, dt, u, chi, s=None, r=None,
+                iters=1, method_name: str) -> np.ndarray:
+        with self.open_session(ts, dx=dx, dt=dt, u=u, chi=chi, s=s, r=r,
+                               iters=iters, method_name=method_name) as session:
+            return session.step().get()
+
+    def process_until_converged(self, ts,
+                                *, dx, dt, u, chi, s=None, r=None,
+                                tolerance, max_steps, check_every=16, norm='max', method_name: str):
+        # Returns state, number of steps done and Stats of the last check (see SimulationSession.run_until_converged)
+        with self.open_session(ts, dx=dx, dt=dt, u=u, chi=chi, s=s, r=r, method_name=method_name) as session:
+            stats = session.run_until_converged(tolerance, max_steps, check_every, norm)
+            return session.get(), session.steps_done, stats
 
     def get_method_names(self):
-        if not self.compiled:
-            self.compile()
+        # Names of kernels files only, so that OpenCL context is not created before the first method is resolved
+        self._detect_methods()
+        return sorted(set(self._cl_sources.keys()) | self._py_names)
+
+    def get_backend_names(self, method_name):
+        return [backend for backend, names, get_method in self._get_backends() if method_name in names]
+
+
+# Processors of worker process of AsyncExecutor(processes=True) by their parameters, so that OpenCL context
+# and built kernels are reused by tasks of the worker
+_worker_processors = {}
+
+
+def get_worker_processor(processor_class=SimulationProcessor, **processor_params):
+    key = (processor_class, tuple(sorted(processor_params.items())))
+    if key not in _worker_processors:
+        _worker_processors[key] = processor_class(**processor_params)
+    return _worker_processors[key]
+
+
+def init_worker_processor(processor_params=None, method_names=(), processor_class=SimulationProcessor):
+    # Initializer of worker processes: creates processor and prepares kernels of methods before the first task
+    processor = get_worker_processor(processor_class, **(processor_params or {}))
+    for method_name in method_names:
+        processor.prepare(method_name)
+
+
+def process_in_worker(ts, processor_params=None, processor_class=SimulationProcessor, **params):
+    # SimulationProcessor.process with processor of current worker, i.e. executor.map(process_in_worker, ts, ...)
+    return get_worker_processor(processor_class, **(processor_params or {})).process(ts, **params)
+
+
+class GridProcessor(SimulationProcessor):
+    """
+    Simulations on 2-D and 3-D grids (ts of shape (ny, nx) or (nz, ny, nx)) with methods from kernels/grid.
+    dx, u and chi are scalars or have a value per axis of ts.
+    """
+    kernels_package = 'thermal.simulation.kernels.grid'
+
+    def __init__(self, cl_context: 'pyopencl.Context'=None, kernels_cache_dir=None, tiled=None, precision='fp32',
+                 stability_mode='off'):
+        # Stability limits are known only for 1-D schemes (see stability.py), so grids are never checked
+        if stability_mode != 'off':
+            raise Exception('Stability mode {} is not supported by GridProcessor!'.format(stability_mode))
+        super().__init__(cl_context, kernels_cache_dir, precision=precision)
+        # Tiling of explicit stencils in local memory: None - chosen by device
+        self._tiled = tiled
+
+    def open_session(self, ts,
+                     *, dx, dt, u, chi, s=None, r=None,
+                     iters=1, method_name: str):
+        ndim = np.ndim(ts)
+        if ndim not in [2, 3]:
+            raise Exception('Grid should be 2-D or 3-D, but has {} dimensions!'.format(ndim))
+        dx, u, chi = [np.broadcast_to(np.float64(value), (ndim,)) for value in [dx, u, chi]]
+        s, r = self._resolve_s_r(dx, dt, u, chi, s, r)
+        return self.create_session(ts, method_name, s=s, r=r, dx=dx, dt=dt, u=u, chi=chi, iters=iters,
+                                   precision=self.precision)
+
+    def create_session(self, ts, method_name, **params):
+        backend, method = self._resolve_method(method_name)
+        if backend == 'py':
+            return GridPySession(method, ts, method_name, **params)
 
-        return sorted(itertools.chain(self._cl_methods.keys(), self._py_methods.keys()))
+        from thermal.simulation.cl_session import GridClSession
+        return GridClSession(self._context, method, ts, method_name, tiled=self._tiled, **params)
@@ -0,0 +1,267 @@
+#
+# Copyright (c) 2015, Nikolay Polyarnyi
+# All rights reserved.
+#
+
+import logging
+import numpy as np
+from abc import ABCMeta, abstractmethod
+from collections import namedtuple
+
+logger = logging.getLogger(__name__)
+
+
+# Parameters of one simulation, in order of scheme_params struct in kernels/_common.cl
+PARAMS_NAMES = ['s', 'r', 'dx', 'dt', 'u', 'chi']
+
+# Precision modes: (dtype of stored state, dtype of arithmetic)
+PRECISIONS = {
+    'fp32': (np.float32, np.float32),
+    'fp64': (np.float64, np.float64),
+    'fp16': (np.float16, np.float32),
+}
+
+# Residual between two successive states (max norm and root mean square of difference) and diagnostics
+# of the latter state (total heat, min and max), batched sessions have values per member
+Stats = namedtuple('Stats', ['residual_max', 'residual_l2', 'total', 'min', 'max'])
+RESIDUAL_NORMS = {'max': 'residual_max', 'l2': 'residual_l2'}
+
+
+def reduce_stats(partial_stats, count):
+    # partial_stats of shape (batch, parts, 5) are reduced as in kernels/_stats.cl
+    partial_stats = np.float64(partial_stats)
+    return Stats(partial_stats[..., 0].max(axis=-1), np.sqrt(partial_stats[..., 1].sum(axis=-1) / count),
+                 partial_stats[..., 2].sum(axis=-1), partial_stats[..., 3].min(axis=-1),
+                 partial_stats[..., 4].max(axis=-1))
+
+
+def numpy_partial_stats(ts, ts_prev=None):
+    # Partial stats of shape (batch, 1, 5) of rows of ts (each row is a batch member),
+    # without previous state residuals are zeros and only total, min and max are computed
+    ts = np.float64(ts)
+    if ts_prev is None:
+        residual_max = residual_l2 = np.zeros(ts.shape[:-1])
+    else:
+        diff = ts - ts_prev
+        residual_max, residual_l2 = np.abs(diff).max(axis=-1), (diff * diff).sum(axis=-1)
+    return np.stack([residual_max, residual_l2, ts.sum(axis=-1),
+                     ts.min(axis=-1), ts.max(axis=-1)], axis=-1)[:, np.newaxis]
+
+
+class SimulationSession(metaclass=ABCMeta):
+
+    def __init__(self, method_name, shape, *, s, r, dx, dt, u, chi, iters=1, precision='fp32', substeps=1):
+        if precision not in PRECISIONS:
+            raise KeyError('Unknown precision: {}!'.format(precision))
+        self.precision = precision
+        self.dtype, self.compute_dtype = map(np.dtype, PRECISIONS[precision])
+        self.method_name = method_name
+        self.shape = tuple(shape)
+        # Arguments of the session, so that it can be created again (see SimulationProcessor.create_session)
+        self.params = dict(s=s, r=r, dx=dx, dt=dt, u=u, chi=chi, iters=iters, precision=precision, substeps=substeps)
+        self.iters = iters
+        # Each step is made of so many kernel steps (s and r are already divided), see stability.py
+        self.substeps = substeps
+        self.steps_done = 0
+        self.converged = False
+        # Multi-level schemes (i.e. explicit_leapfrog) keep previous time level, so state alone does not define run
+        self.multilevel = False
+        self._params = self._pack_params(s=s, r=r, dx=dx, dt=np.divide(dt, iters * substeps), u=u, chi=chi)
+
+    def _pack_params(self, *, s, r, dx, dt, u, chi):
+        # Batched simulations (2-D ts) are rows of the state, each parameter is a scalar or has a value per row
+        assert len(self.shape) in [1, 2]
+        self.batched = len(self.shape) == 2
+        self.batch = self.shape[0] if self.batched else 1
+        self.n = self.shape[-1]
+        values = dict(s=s, r=r, dx=dx, dt=dt, u=u, chi=chi)
+        return np.column_stack([np.broadcast_to(np.float64(values[name]), (self.batch,)) for name in PARAMS_NAMES])
+
+    def step(self, iters=None):
+        iters = self.iters if iters is None else iters
+        if iters > 0:
+            self._step(iters * self.substeps)
+            self.steps_done += iters
+        return self
+
+    def run(self, steps, sink=None):
+        # Advances by steps and passes states to sink (i.e. SnapshotWriter) every sink.every steps
+        if sink is None:
+            return self.step(steps)
+
+        if self.steps_done == 0:
+            sink.write(self.steps_done, self.get())
+        while steps > 0:
+            iters = min(steps, sink.every - self.steps_done % sink.every)
+            self.step(iters)
+            steps -= iters
+            if self.steps_done % sink.every == 0:
+                sink.write(self.steps_done, self.get())
+        return self
+
+    def step_with_stats(self):
+        # Makes one step and returns Stats of states before and after it
+        previous = self._save_state()
+        self.step(1)
+        stats = self._stats(previous)
+        if not self.batched:
+            stats = Stats(*[value[0] for value in stats])
+        return stats
+
+    def run_until_converged(self, tolerance, max_steps, check_every=16, norm='max'):
+        # Every check_every steps residual of one step is checked, stops when it is below tolerance
+        # (for each batch member) or after max_steps, returns Stats of the last check
+        self.converged = False
+        stats = None
+        while max_steps > 0:
+            steps = min(check_every, max_steps)
+            self.step(steps - 1)
+            stats = self.step_with_stats()
+            max_steps -= steps
+            if np.all(getattr(stats, RESIDUAL_NORMS[norm]) < tolerance):
+                self.converged = True
+                break
+        return stats
+
+    def get_stats(self):
+        # Stats of current state (min, max and total), so that they are not computed from downloaded state
+        stats = self._stats(None)
+        if not self.batched:
+            stats = Stats(*[value[0] for value in stats])
+        return stats
+
+    def get_levels(self):
+        # Host copies of all time levels of the scheme, from the oldest one to the current state
+        return [self.get()]
+
+    def set_previous_level(self, ts_prev):
+        # Restores previous time level of multi-level scheme, i.e. from checkpoint
+        raise NotImplementedError('Multi-level schemes are not supported by {}!'.format(type(self).__name__))
+
+    @abstractmethod
+    def _get_state(self):
+        # Current state in the form accepted by _stats
+        pass
+
+    @abstractmethod
+    def _save_state(self):
+        # Copy of current state that is not changed by the next steps
+        pass
+
+    @abstractmethod
+    def _stats(self, previous):
+        # Stats of states with values per batch member, previous is None for stats of current state alone
+        pass
+
+    @abstractmethod
+    def _step(self, iters):
+        pass
+
+    @abstractmethod
+    def get(self):
+        pass
+
+    def finish(self):
+        # Waits for all enqueued steps
+        pass
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+
+class PySession(SimulationSession):
+
+    def __init__(self, kernel_module, ts, method_name, **params):
+        ts = np.array(ts)
+        super().__init__(method_name, ts.shape, **params)
+        self._kernel = kernel_module
+        self._ts = ts.astype(self.dtype)
+
+        if len(self.shape) == 1:
+            self._args = tuple(map(float, self._params[0]))
+        else:
+            self._args = tuple(self._params[:, [i]].astype(self.compute_dtype) for i in range(len(PARAMS_NAMES)))
+
+        # Second time level of multi-level schemes (i.e. explicit_leapfrog), None until the first step
+        self.multilevel = hasattr(kernel_module, 'solve_levels')
+        self._ts_prev = None
+
+    def _step(self, iters):
+        # Kernels compute in dtype of given state, between calls state is kept in storage dtype
+        ts = self._ts.astype(self.compute_dtype, copy=False)
+        if not self.multilevel:
+            self._ts = self._kernel.solve(ts, *(self._args + (iters,))).astype(self.dtype, copy=False)
+            return
+
+        if self._ts_prev is None:
+            self._ts_prev, ts = self._ts, self._kernel.solve(ts, *(self._args + (1,)))
+            iters -= 1
+        ts_prev = self._ts_prev.astype(self.compute_dtype, copy=False)
+        ts_prev, ts = self._kernel.solve_levels(ts_prev, ts, *(self._args + (iters,)))
+        self._ts_prev, self._ts = ts_prev.astype(self.dtype, copy=False), ts.astype(self.dtype, copy=False)
+
+    def get_levels(self):
+        return ([] if self._ts_prev is None else [self._ts_prev.copy()]) + [self.get()]
+
+    def set_previous_level(self, ts_prev):
+        assert self.multilevel
+        self._ts_prev = np.array(ts_prev, self.dtype).reshape(self.shape)
+
+    def _get_state(self):
+        return self._ts
+
+    def _save_state(self):
+        # Kernels never change state in-place
+        return self._ts
+
+    def _stats(self, previous):
+        previous = None if previous is None else previous.reshape(self.batch, self.n)
+        return reduce_stats(numpy_partial_stats(self._ts.reshape(self.batch, self.n), previous), self.n)
+
+    def get(self):
+        return self._ts.copy()
+
+
+class GridSession(SimulationSession):
+
+    def _pack_params(self, *, s, r, dx, dt, u, chi):
+        # Per axis values of s and r in order of axes of ts
+        assert len(self.shape) in [2, 3]
+        self.batched = False
+        self.s, self.r = [np.broadcast_to(np.float64(value), (len(self.shape),)) for value in [s, r]]
+        # In order of grid_params struct in kernels/grid/_grid.cl: axes from x (the last axis of ts), absent axes are 0
+        padding = np.zeros(3 - len(self.shape))
+        return np.concatenate([self.s[::-1], padding, self.r[::-1], padding])[np.newaxis]
+
+
+class GridPySession(GridSession):
+
+    def __init__(self, kernel_module, ts, method_name, **params):
+        ts = np.array(ts)
+        super().__init__(method_name, ts.shape, **params)
+        self._kernel = kernel_module
+        self._ts = ts.astype(self.dtype)
+
+    def _step(self, iters):
+        ts = self._ts.astype(self.compute_dtype, copy=False)
+        self._ts = self._kernel.solve(ts, self.s, self.r, iters).astype(self.dtype, copy=False)
+
+    def _get_state(self):
+        return self._ts
+
+    def _save_state(self):
+        return self._ts
+
+    def _stats(self, previous):
+        previous = None if previous is None else previous.reshape(1, -1)
+        return reduce_stats(numpy_partial_stats(self._ts.reshape(1, -1), previous), self._ts.size)
+
+    def get(self):
+        return self._ts.copy()
+
@@ -0,0 +1,145 @@
+#
+# Copyright (c) 2015, Nikolay Polyarnyi
+# All rights reserved.
+#
+
+import os
+import json
+import queue
+import logging
+import threading
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+def _metadata_path(path):
+    return '{}.json'.format(path)
+
+
+class SnapshotWriter:
+    """
+    Appends states of simulation to raw file with layout (time, n) (or (time, batch, n) for batched sessions).
+    File grows and is memory-mapped by chunks of `chunk_steps` snapshots, and is written by background thread,
+    so the simulation only waits if the bounded queue of `queue_size` snapshots is full.
+    Every `every`-th step and every `space_step`-th cell is kept. Metadata is stored in '<path>.json'.
+    """
+
+    def __init__(self, path, *, every=1, space_step=1, chunk_steps=256, queue_size=16, dtype=np.float32):
+        self.path = str(path)
+        self.every = every
+        self.space_step = space_step
+        self._chunk_steps = chunk_steps
+        self._dtype = np.dtype(dtype)
+
+        self._shape = None
+        self._steps = []
+        self._count = 0
+        self._chunk = None
+        self._chunk_start = 0
+        self._error = None
+
+        with open(self.path, 'wb'):
+            pass
+        self._queue = queue.Queue(queue_size)
+        self._thread = threading.Thread(target=self._write_loop, name='SnapshotWriter', daemon=True)
+        self._thread.start()
+
+    def write(self, step, ts):
+        self._check_error()
+        ts = np.asarray(ts)[..., ::self.space_step]
+        self._queue.put((step, ts))
+
+    def _check_error(self):
+        if self._error is not None:
+            raise Exception('Snapshots writing to {} failed!'.format(self.path)) from self._error
+
+    def _write_loop(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            if self._error is not None:
+                continue
+            try:
+                self._append(*item)
+            except Exception as e:
+                logger.error('Snapshot can not be written to {}!'.format(self.path), exc_info=True)
+                self._error = e
+
+    def _append(self, step, ts):
+        if self._shape is None:
+            self._shape = ts.shape
+        assert ts.shape == self._shape, 'Snapshot shape changed from {} to {}!'.format(self._shape, ts.shape)
+
+        if self._chunk is None or self._count - self._chunk_start == self._chunk_steps:
+            self._next_chunk()
+        self._chunk[self._count - self._chunk_start] = ts
+        self._steps.append(step)
+        self._count += 1
+
+    def _next_chunk(self):
+        if self._chunk is not None:
+            self._chunk.flush()
+            self._write_metadata()
+        self._chunk_start = self._count
+        row_bytes = self._dtype.itemsize * int(np.prod(self._shape))
+        with open(self.path, 'r+b') as f:
+            f.truncate(row_bytes * (self._chunk_start + self._chunk_steps))
+        self._chunk = np.memmap(self.path, self._dtype, 'r+', offset=row_bytes * self._chunk_start,
+                                shape=(self._chunk_steps,) + self._shape)
+
+    def _write_metadata(self):
+        metadata = dict(dtype=self._dtype.str, shape=list(self._shape or []), count=self._count, steps=self._steps,
+                        every=self.every, space_step=self.space_step)
+        tmp_path = '{}.tmp'.format(_metadata_path(self.path))
+        with open(tmp_path, 'w') as f:
+            json.dump(metadata, f)
+        os.replace(tmp_path, _metadata_path(self.path))
+
+    def close(self):
+        if self._thread is None:
+            return
+        self._queue.put(None)
+        self._thread.join()
+        self._thread = None
+
+        if self._chunk is not None:
+            self._chunk.flush()
+            self._chunk = None
+            # Unused rows of the last chunk are cut off
+            row_bytes = self._dtype.itemsize * int(np.prod(self._shape))
+            with open(self.path, 'r+b') as f:
+                f.truncate(row_bytes * self._count)
+        self._write_metadata()
+        self._check_error()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+
+class SnapshotReader:
+
+    def __init__(self, path):
+        self.path = str(path)
+        with open(_metadata_path(self.path)) as f:
+            metadata = json.load(f)
+        self.steps = metadata['steps']
+        self.every = metadata['every']
+        self.space_step = metadata['space_step']
+        self._count = metadata['count']
+        self._data = None
+        if self._count > 0:
+            self._data = np.memmap(self.path, np.dtype(metadata['dtype']), 'r',
+                                   shape=(self._count,) + tuple(metadata['shape']))
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, index):
+        if self._data is None:
+            raise IndexError('No snapshots in {}!'.format(self.path))
+        return self._data[index]
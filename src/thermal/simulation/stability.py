@@ -0,0 +1,99 @@
+#
+# Copyright (c) 2015, Nikolay Polyarnyi
+# All rights reserved.
+#
+
+import logging
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Three-point schemes as (left, center, right) coefficients: of explicit update
+# t'[i] = left * t[i - 1] + center * t[i] + right * t[i + 1]
+# or of implicit system row left * t'[i - 1] + center * t'[i] + right * t'[i + 1] = t[i]
+EXPLICIT_SCHEMES = {
+    'explicit_central': lambda s, r: (r + s / 2, 1 - 2 * r, r - s / 2),
+    'explicit_by_flow': lambda s, r: (r, 1 + s - 2 * r, r - s),
+    'explicit_counter_flow': lambda s, r: (r + s, 1 - s - 2 * r, r),
+}
+IMPLICIT_SCHEMES = {
+    'implicit_central': lambda s, r: (-(r + s / 2), 1 + 2 * r, -(r - s / 2)),
+    'implicit_by_flow': lambda s, r: (-r, 1 - s + 2 * r, s - r),
+    'implicit_counter_flow': lambda s, r: (-(s + r), 1 + s + 2 * r, -r),
+}
+
+# Implicit methods to switch unstable explicit ones to
+IMPLICIT_COUNTERPARTS = {
+    'explicit_central': 'implicit_central',
+    'explicit_by_flow': 'implicit_by_flow',
+    'explicit_counter_flow': 'implicit_counter_flow',
+    'explicit_leapfrog': 'implicit_central',
+}
+
+MAX_SUBSTEPS = 2 ** 16
+
+
+class UnstableMethodError(Exception):
+    # Method is unstable with given parameters and stability mode does not allow to run it
+    pass
+
+
+# Modes of SimulationProcessor: 'off' - no checks, 'auto' - each step is split into the minimal number
+# of stable sub-steps, 'reject' - unstable parameters raise, 'implicit' - unstable explicit method
+# is replaced with its implicit counterpart
+MODES = ['off', 'auto', 'reject', 'implicit']
+
+_THETAS = np.linspace(0, np.pi, 257)
+# Unconditionally unstable schemes (i.e. explicit_central without diffusion) have amplification factor
+# slightly above 1 for small steps, so it is compared with 1 up to rounding errors only
+_TOLERANCE = 1e-12
+
+
+def amplification(method_name, s, r):
+    """
+    Maximal von Neumann amplification factor over all wave numbers or None if method is unknown.
+    >>> round(amplification('explicit_central', 0.0, 0.5), 9)
+    1.0
+    >>> amplification('explicit_central', 0.0, 0.6) > 1
+    True
+    """
+    waves = np.exp(1j * _THETAS)
+    if method_name in EXPLICIT_SCHEMES:
+        left, center, right = EXPLICIT_SCHEMES[method_name](s, r)
+        return float(np.abs(left / waves + center + right * waves).max())
+    if method_name in IMPLICIT_SCHEMES:
+        left, center, right = IMPLICIT_SCHEMES[method_name](s, r)
+        return float((1 / np.abs(left / waves + center + right * waves)).max())
+    if method_name == 'explicit_leapfrog':
+        # Three-level scheme is neutrally stable for pure advection with |s| <= 1 and unstable with diffusion
+        return 1.0 if r == 0 and abs(s) <= 1 else np.inf
+    return None
+
+
+def is_stable(method_name, s, r):
+    # True, False or None if method is unknown, batched s and r are stable if each member is
+    members = np.broadcast(np.float64(s), np.float64(r))
+    factors = [amplification(method_name, member_s, member_r) for member_s, member_r in members]
+    if any(factor is None for factor in factors):
+        return None
+    return all(factor <= 1 + _TOLERANCE for factor in factors)
+
+
+def choose_substeps(method_name, s, r):
+    # Minimal k such that k steps with s / k and r / k are stable, None if there is no such k
+    if is_stable(method_name, s, r) in [None, True]:
+        return 1
+
+    # Stability of schemes above only improves with smaller steps, so the first stable k is found by bisection
+    low, high = 1, 2
+    while not is_stable(method_name, np.divide(s, high), np.divide(r, high)):
+        low, high = high, high * 2
+        if high > MAX_SUBSTEPS:
+            return None
+    while high - low > 1:
+        middle = (low + high) // 2
+        if is_stable(method_name, np.divide(s, middle), np.divide(r, middle)):
+            high = middle
+        else:
+            low = middle
+    return high
@@ -0,0 +1,238 @@
+#
+# Copyright (c) 2015, Nikolay Polyarnyi
+# All rights reserved.
+#
+
+import os
+import sys
+import json
+import time
+import asyncio
+import hashlib
+import argparse
+import itertools
+import collections
+import numpy as np
+
+from thermal import run
+from thermal.utils.support import AsyncExecutor
+from thermal.simulation import initial_generators
+from thermal.simulation.processor import get_worker_processor, init_worker_processor
+
+# Parameters of one run of a sweep, defaults are the same as of thermal.run
+RUN_PARAMS = ['method', 'initial_function', 'n', 'dx', 'dt', 'u', 'chi', 'iters', 'steps']
+DEFAULT_RUN = {name: run.DEFAULT_CONFIG[name] for name in RUN_PARAMS}
+# Runs equal in these parameters are batched into one session (physical parameters have a value per batch member),
+# also batched runs use the same method and number of sub-steps chosen by stability mode (see check_runs)
+BATCH_PARAMS = ['method', 'initial_function', 'n', 'iters', 'steps']
+# Parameters of SimulationProcessor that can be set for sweep
+DEFAULT_PROCESSOR_PARAMS = dict(precision=run.DEFAULT_CONFIG['precision'],
+                                stability_mode=run.DEFAULT_CONFIG['stability'])
+
+# Columns of results file: parameters of run, its key, hash of final state, seconds per run (batch time divided
+# by batch size), size of the batch, residual of the last step, Stats of final state and error of failed run
+# (failed runs have empty hash, zero batch and NaN values, successful ones have empty error)
+COLUMNS = RUN_PARAMS + ['key', 'state_hash', 'runtime', 'batch', 'residual_max', 'total', 'min', 'max', 'error']
+
+
+def expand_runs(spec):
+    """
+    Runs of a sweep: spec is a list of runs or a grid - dict with list of values for some of parameters.
+    Omitted parameters have default values.
+    >>> [(r['u'], r['chi']) for r in expand_runs(dict(u=[0.1, 0.2], chi=[0.01, 0.02]))]
+    [(0.1, 0.01), (0.1, 0.02), (0.2, 0.01), (0.2, 0.02)]
+    """
+    if isinstance(spec, dict):
+        unknown = set(spec) - set(RUN_PARAMS)
+        if len(unknown) > 0:
+            raise KeyError('Unknown sweep parameters: {}!'.format(', '.join(sorted(unknown))))
+        names = list(spec.keys())
+        axes = [spec[name] if isinstance(spec[name], list) else [spec[name]] for name in names]
+        spec = [dict(zip(names, values)) for values in itertools.product(*axes)]
+
+    runs = []
+    for run_params in spec:
+        unknown = set(run_params) - set(RUN_PARAMS)
+        if len(unknown) > 0:
+            raise KeyError('Unknown run parameters: {}!'.format(', '.join(sorted(unknown))))
+        run_params = dict(DEFAULT_RUN, **run_params)
+        if run_params['initial_function'] not in initial_generators.list_functions():
+            raise KeyError('Unknown initial function: {}!'.format(run_params['initial_function']))
+        if run_params['steps'] < 1:
+            raise Exception('Each run should make at least one step!')
+        runs.append(run_params)
+    return runs
+
+
+def run_key(run_params, processor_params=None):
+    # Identifies run by everything its result depends on, so that finished runs are skipped on resume
+    description = json.dumps([run_params, processor_params or {}], sort_keys=True)
+    return hashlib.sha1(description.encode()).hexdigest()[:16]
+
+
+def failed_summary(run_params, error):
+    return dict(run_params, state_hash='', runtime=float('nan'), batch=0, residual_max=float('nan'),
+                total=float('nan'), min=float('nan'), max=float('nan'), error=str(error))
+
+
+def check_runs(runs, processor_params=None):
+    # Returns runs with method and number of sub-steps chosen by stability mode (as 'stability')
+    # and summaries of runs rejected by it
+    processor = get_worker_processor(**(processor_params or {}))
+    checked, failed = [], []
+    for run_params in runs:
+        try:
+            stability = processor.check_stability(run_params['method'],
+                                                  **{name: run_params[name] for name in ['dx', 'dt', 'u', 'chi']})
+        except Exception as e:
+            failed.append(failed_summary(run_params, e))
+            continue
+        checked.append(dict(run_params, stability=stability))
+    return checked, failed
+
+
+def make_batches(runs, batch_size):
+    groups = collections.OrderedDict()
+    for run_params in runs:
+        group = tuple(run_params[name] for name in BATCH_PARAMS) + (run_params.get('stability'),)
+        groups.setdefault(group, []).append(run_params)
+    return [group[i:i + batch_size] for group in groups.values() for i in range(0, len(group), batch_size)]
+
+
+def run_batch(runs, processor_params=None):
+    # Runs batch in one session (with processor of current worker), returns summaries of runs.
+    # If the batch fails, its runs are run one by one, so that only failing runs are recorded as failed
+    try:
+        return _run_batch(runs, processor_params)
+    except Exception as e:
+        if len(runs) == 1:
+            return [failed_summary(runs[0], e)]
+        return [summary for run_params in runs for summary in run_batch([run_params], processor_params)]
+
+
+def _run_batch(runs, processor_params):
+    first = runs[0]
+    processor = get_worker_processor(**(processor_params or {}))
+    ts = getattr(initial_generators, first['initial_function'])(first['n'], first['n'] // 2)
+    ts = np.tile(ts, (len(runs), 1))
+    params = {name: np.float64([run_params[name] for run_params in runs]) for name in ['dx', 'dt', 'u', 'chi']}
+
+    start = time.time()
+    with processor.open_session(ts, method_name=first['method'], iters=first['iters'], **params) as session:
+        session.step(first['steps'] - 1)
+        residual_max = session.step_with_stats().residual_max
+        stats = session.get_stats()
+        ts = session.get()
+    runtime = (time.time() - start) / len(runs)
+
+    summaries = []
+    for i, run_params in enumerate(runs):
+        state_hash = hashlib.sha1(np.ascontiguousarray(ts[i]).tobytes()).hexdigest()
+        summaries.append(dict(run_params, state_hash=state_hash, runtime=runtime, batch=len(runs),
+                              residual_max=residual_max[i], total=stats.total[i], min=stats.min[i], max=stats.max[i],
+                              error=''))
+    return summaries
+
+
+class SweepResults:
+    """
+    Columnar results of a sweep in .npz file with one array per column (see COLUMNS).
+    File is replaced atomically on each save, so interrupted sweep loses only the runs in progress.
+    """
+
+    def __init__(self, path):
+        self.path = str(path)
+        self._rows = []
+        if os.path.exists(self.path):
+            with np.load(self.path) as columns:
+                columns = {name: columns[name].tolist() for name in COLUMNS}
+            self._rows = [dict(zip(COLUMNS, values)) for values in zip(*[columns[name] for name in COLUMNS])]
+        self.keys = set(row['key'] for row in self._rows)
+
+    def __len__(self):
+        return len(self._rows)
+
+    def append(self, summaries):
+        self._rows.extend(summaries)
+        self.keys.update(summary['key'] for summary in summaries)
+
+    def get_columns(self):
+        return {name: np.array([row[name] for row in self._rows]) for name in COLUMNS}
+
+    def save(self):
+        tmp_path = '{}.tmp'.format(self.path)
+        with open(tmp_path, 'wb') as f:
+            np.savez(f, **self.get_columns())
+        os.replace(tmp_path, self.path)
+
+
+@asyncio.coroutine
+def _run_batches(executor, batches, processor_params, results, log):
+    futures = [asyncio.ensure_future(executor.map(run_batch, batch, processor_params)) for batch in batches]
+    try:
+        for future in asyncio.as_completed(futures):
+            results.append((yield from future))
+            results.save()
+            if log is not None:
+                log('{} runs done'.format(len(results)))
+    finally:
+        for future in futures:
+            future.cancel()
+
+
+def sweep(spec, results_path, *, workers=1, batch_size=16, processor_params=None, log=None):
+    # Runs of spec (see expand_runs) not yet in results file are run in batches by workers processes
+    # (with workers=1 - in this process), returns SweepResults
+    processor_params = dict(DEFAULT_PROCESSOR_PARAMS, **(processor_params or {}))
+    results = SweepResults(results_path)
+    runs = []
+    for run_params in expand_runs(spec):
+        key = run_key(run_params, processor_params)
+        if key not in results.keys:
+            runs.append(dict(run_params, key=key))
+    if log is not None:
+        log('{} runs to do, {} done before'.format(len(runs), len(results)))
+    if len(runs) == 0:
+        return results
+
+    runs, failed = check_runs(runs, processor_params)
+    if len(failed) > 0:
+        results.append(failed)
+        results.save()
+        if log is not None:
+            log('{} runs rejected by stability mode {}'.format(len(failed), processor_params['stability_mode']))
+    if len(runs) == 0:
+        return results
+
+    executor = AsyncExecutor(workers, processes=workers > 1,
+                             initializer=init_worker_processor, initargs=(processor_params,))
+    try:
+        asyncio.get_event_loop().run_until_complete(
+            _run_batches(executor, make_batches(runs, batch_size), processor_params, results, log))
+    finally:
+        executor.shutdown()
+    return results
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description='Runs sweep over methods and parameters without GUI.')
+    parser.add_argument('spec', help='path to JSON file with list of runs or with grid of parameters'
+                                     ' ({}), i.e. {{"method": ["explicit_central", "implicit_central"],'
+                                     ' "u": [0.05, 0.1]}}'.format(', '.join(RUN_PARAMS)))
+    parser.add_argument('results', help='path to .npz results file, runs already in it are skipped')
+    parser.add_argument('--workers', type=int, default=1, help='number of worker processes')
+    parser.add_argument('--batch-size', dest='batch_size', type=int, default=16,
+                        help='maximal number of runs in one session')
+    parser.add_argument('--precision', choices=['fp32', 'fp64', 'fp16'], default=DEFAULT_PROCESSOR_PARAMS['precision'])
+    parser.add_argument('--stability', choices=['off', 'auto', 'reject', 'implicit'],
+                        default=DEFAULT_PROCESSOR_PARAMS['stability_mode'])
+    args = parser.parse_args(args)
+
+    with open(args.spec) as f:
+        spec = json.load(f)
+    sweep(spec, args.results, workers=args.workers, batch_size=args.batch_size,
+          processor_params=dict(precision=args.precision, stability_mode=args.stability), log=print)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -3,18 +3,22 @@
 # All rights reserved.
 #
 
+import os
+import hashlib
 import logging
+import tempfile
 import pyopencl as cl
 
 logger = logging.getLogger(__name__)
 
 
-def create_context():
+def create_context(multi_device=False, sub_devices=1):
+    # multi_device - all devices of chosen type and platform, sub_devices - each device is split in so many parts
     platforms = cl.get_platforms()
     logger.debug('OpenCL platforms: {}'.format(['{}: {}.'.format(platform.get_info(cl.platform_info.VENDOR),
                                                                 platform.get_info(cl.platform_info.NAME))
                                                 for platform in platforms]))
-    device_to_use = None
+    devices_to_use = None
     for device_type, type_str in [(cl.device_type.GPU, 'GPU'), (cl.device_type.CPU, 'CPU')]:
         for platform in platforms:
             devices = platform.get_devices(device_type)
@@ -22,10 +26,71 @@ def create_context():
                 logger.debug('OpenCL {} devices in {}: {}.'.format(type_str,
                                                                    platform.get_info(cl.platform_info.NAME),
                                                                    [device.get_info(cl.device_info.NAME) for device in devices]))
-                if device_to_use is None:
-                    device_to_use = devices[0]
-                    logger.info('OpenCL device to use: {} {}'.format(platform.get_info(cl.platform_info.NAME),
-                                                                     devices[0].get_info(cl.device_info.NAME)))
-    if device_to_use is None:
+                if devices_to_use is None:
+                    devices_to_use = devices if multi_device else devices[:1]
+                    logger.info('OpenCL devices to use: {} {}'.format(platform.get_info(cl.platform_info.NAME),
+                                                                      [device.get_info(cl.device_info.NAME)
+                                                                       for device in devices_to_use]))
+    if devices_to_use is None:
         raise Exception('No OpenCL CPU or GPU device found!')
-    return cl.Context([device_to_use])
+    if sub_devices > 1:
+        devices_to_use = [sub_device for device in devices_to_use
+                          for sub_device in create_sub_devices(device, sub_devices)]
+    return cl.Context(devices_to_use)
+
+
+def create_sub_devices(device: cl.Device, count):
+    units = device.get_info(cl.device_info.MAX_COMPUTE_UNITS)
+    if count > units or cl.device_partition_property.EQUALLY not in device.get_info(cl.device_info.PARTITION_PROPERTIES):
+        logger.warning('OpenCL device {} can not be split in {} sub-devices!'.format(device.name, count))
+        return [device]
+    return device.create_sub_devices([cl.device_partition_property.EQUALLY, units // count])
+
+
+def default_cache_dir():
+    cache_home = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(cache_home, 'thermal', 'kernels')
+
+
+def _program_cache_key(device: cl.Device, source, options):
+    key = hashlib.sha256(source.encode('utf-8'))
+    key.update(' '.join(options).encode('utf-8'))
+    for info in [cl.device_info.NAME, cl.device_info.VERSION, cl.device_info.DRIVER_VERSION]:
+        key.update(device.get_info(info).encode('utf-8'))
+    key.update(device.platform.get_info(cl.platform_info.VERSION).encode('utf-8'))
+    return key.hexdigest()
+
+
+def build_program(context: cl.Context, source, options=(), cache_dir=None) -> cl.Program:
+    # Binary for each device is cached on disk by hash of source, build options, device and driver versions
+    # cache_dir=None means default_cache_dir(), cache_dir=False disables caching
+    options = list(options)
+    if cache_dir is False:
+        return cl.Program(context, source).build(options, cache_dir=False)
+
+    cache_dir = cache_dir or default_cache_dir()
+    cache_paths = [os.path.join(cache_dir, '{}.bin'.format(_program_cache_key(device, source, options)))
+                   for device in context.devices]
+    if all(map(os.path.exists, cache_paths)):
+        try:
+            binaries = []
+            for path in cache_paths:
+                with open(path, 'rb') as f:
+                    binaries.append(f.read())
+            program = cl.Program(context, context.devices, binaries).build(options)
+            logger.debug('OpenCL program loaded from cache: {}'.format(cache_paths))
+            return program
+        except cl.Error as e:
+            logger.warning('Cached OpenCL program {} is broken, rebuilding... ({})'.format(cache_paths, e))
+
+    program = cl.Program(context, source).build(options, cache_dir=False)
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        for path, binary in zip(cache_paths, program.get_info(cl.program_info.BINARIES)):
+            # Written atomically, so concurrent processes never read a partial binary
+            with tempfile.NamedTemporaryFile('wb', dir=cache_dir, delete=False) as f:
+                f.write(binary)
+            os.replace(f.name, path)
+    except OSError as e:
+        logger.warning('OpenCL program can not be cached to {}! ({})'.format(cache_dir, e))
+    return program
@@ -22,7 +22,7 @@ OpenGL.ERROR_CHECKING = True
 from OpenGL.GL.VERSION.GL_1_0 import GLenum, GLuint, glTexImage1D, glTexImage2D, glViewport, glEnable, glDisable, glFinish, glReadPixels, glGetTexImage
 from OpenGL.GL.VERSION.GL_1_0 import GL_UNSIGNED_BYTE, GL_SHORT, GL_INT, GL_UNSIGNED_INT, GL_FLOAT, GL_TRUE, GL_FALSE
 from OpenGL.GL.VERSION.GL_1_0 import glTexParameteri, glTexParameterf, glTexParameterfv, glTexParameteriv, glPixelStorei, glGetIntegerv
-from OpenGL.GL.VERSION.GL_1_0 import glLineWidth, glPointSize, glGetIntegerv
+from OpenGL.GL.VERSION.GL_1_0 import glLineWidth, glPointSize, glGetIntegerv, GL_MAX_TEXTURE_SIZE
 from OpenGL.GL.VERSION.GL_1_1 import GL_UNPACK_ROW_LENGTH, GL_UNPACK_SKIP_ROWS, GL_UNPACK_SKIP_PIXELS, GL_PACK_ALIGNMENT, GL_UNPACK_ALIGNMENT
 from OpenGL.GL.VERSION.GL_1_1 import glBindTexture, glGenTextures, glDeleteTextures, glTexSubImage2D, GL_TEXTURE_1D, GL_TEXTURE_2D
 from OpenGL.GL.VERSION.GL_1_1 import GL_TEXTURE_MIN_FILTER, GL_TEXTURE_MAG_FILTER
@@ -274,6 +274,49 @@ def create_tex(w, h, internal_format, params=NEAREST_NEAREST) -> Texture2D:
     return tex
 
 
+def get_max_texture_size():
+    return int(glGetIntegerv(GL_MAX_TEXTURE_SIZE))
+
+
+class StreamingTexture2D(GLReleasable):
+    """
+    Texture with storage allocated once and contents updated in place with glTexSubImage2D.
+    Data is uploaded through two pixel buffer objects used in turn, so that the driver can transfer one of them
+    to the texture while the next frame is written to the other one.
+    """
+
+    def __init__(self, w, h, internal_format=GL_R32F, gl_format=GL_RED, gl_type=GL_FLOAT, itemsize=4,
+                 params=NEAREST_NEAREST):
+        super().__init__()
+        self.size = (w, h)
+        self.texture = create_tex(w, h, internal_format, params)
+        self._gl_format, self._gl_type = gl_format, gl_type
+        self._nbytes = w * h * itemsize
+        self._pbos = [PixelBufferObject(), PixelBufferObject()]
+        for pbo in self._pbos:
+            pbo.set_size(self._nbytes, GL_STREAM_DRAW)
+        self._next_pbo = 0
+
+    def update(self, data):
+        # data - contiguous array of at most w * h items in row-major order, the rest of texture is left undefined
+        data = _np.ascontiguousarray(data)
+        assert data.nbytes <= self._nbytes
+        pbo = self._pbos[self._next_pbo]
+        self._next_pbo = 1 - self._next_pbo
+        w, h = self.size
+        with pbo:
+            # Orphaning: if previous upload from this buffer is still in flight, driver provides fresh storage
+            glBufferData(pbo.target, self._nbytes, None, GL_STREAM_DRAW)
+            with BufferMapper(pbo, GL_WRITE_ONLY) as pointer:
+                ctypes.memmove(pointer, data.ctypes.data, data.nbytes)
+            with self.texture, configure_pixel_store([(GL_UNPACK_ALIGNMENT, 1)]):
+                glTexSubImage2D(self.texture.target, 0, 0, 0, w, h, self._gl_format, self._gl_type,
+                                ctypes.c_void_p(0))
+
+    def _release(self):
+        release([self.texture] + self._pbos)
+
+
 def read_texture(texture, size, channels, gl_format, dtype):
     w, h = size
     if channels == 1:
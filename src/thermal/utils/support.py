@@ -6,18 +6,125 @@
 import asyncio
 import logging
 import functools
+import multiprocessing
 import numpy as np
 
-from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
 
 logger = logging.getLogger(__name__)
 
 
+class SharedArray:
+    """
+    Numpy array in shared memory. It is pickled as name of the memory block, so it is passed between processes
+    without copying of data through pipes. Creator of the block unlinks it.
+    """
+
+    def __init__(self, shape, dtype, name=None):
+        # Python 3.8+ only, so it is imported only by AsyncExecutor(processes=True)
+        from multiprocessing.shared_memory import SharedMemory
+
+        self.shape, self.dtype = tuple(shape), np.dtype(dtype)
+        size = max(1, int(np.prod(self.shape)) * self.dtype.itemsize)
+        if name is None:
+            self._shm = SharedMemory(create=True, size=size)
+        else:
+            self._shm = SharedMemory(name)
+        self.name = self._shm.name
+        self.array = np.ndarray(self.shape, self.dtype, buffer=self._shm.buf)
+
+    @classmethod
+    def copy_of(cls, array):
+        shared = cls(array.shape, array.dtype)
+        shared.array[...] = array
+        return shared
+
+    def __reduce__(self):
+        return SharedArray, (self.shape, self.dtype.str, self.name)
+
+    def close(self):
+        self.array = None
+        self._shm.close()
+
+    def unlink(self):
+        self._shm.unlink()
+
+
+def _is_shareable(value):
+    return isinstance(value, np.ndarray) and not value.dtype.hasobject
+
+
+def _share_results(result):
+    # Arrays of result (or of result tuple) are returned in shared memory, unlinked by receiver
+    if isinstance(result, tuple):
+        return tuple(map(_share_results, result))
+    if _is_shareable(result):
+        shared = SharedArray.copy_of(result)
+        shared.close()
+        return shared
+    return result
+
+
+def _receive_results(result):
+    if isinstance(result, tuple):
+        return tuple(map(_receive_results, result))
+    if isinstance(result, SharedArray):
+        array = result.array.copy()
+        result.close()
+        result.unlink()
+        return array
+    return result
+
+
+def _release_arrays(shared, future=None):
+    # Unlinks shared arrays, also as done callback of future of the task that used them
+    for value in shared:
+        value.close()
+        value.unlink()
+
+
+def _discard_results(future):
+    # Done callback of task whose results are never received (awaiting coroutine was cancelled)
+    if not future.cancelled() and future.exception() is None:
+        result = future.result()
+        _release_arrays([value for value in (result if isinstance(result, tuple) else (result,))
+                         if isinstance(value, SharedArray)])
+
+
+def _call_with_shared_arrays(fn, args, kwargs):
+    # Runs in worker process: shared arrays are passed to fn as numpy arrays
+    shared = [value for value in list(args) + list(kwargs.values()) if isinstance(value, SharedArray)]
+    args = [value.array if isinstance(value, SharedArray) else value for value in args]
+    kwargs = {key: value.array if isinstance(value, SharedArray) else value for key, value in kwargs.items()}
+    try:
+        return _share_results(fn(*args, **kwargs))
+    finally:
+        del args, kwargs
+        for value in shared:
+            try:
+                value.close()
+            except BufferError:
+                # fn kept a view of its input, memory is unmapped when the view is collected
+                pass
+
+
 class AsyncExecutor:
 
-    def __init__(self, max_workers, loop=None):
-        """:type loop: asyncio.events.AbstractEventLoop"""
-        self.executor = ThreadPoolExecutor(max_workers)
+    def __init__(self, max_workers, loop=None, *, processes=False, initializer=None, initargs=()):
+        """
+        :type loop: asyncio.events.AbstractEventLoop
+        processes - run functions in pool of processes (spawned, so that OpenCL contexts are not inherited),
+        then functions and arguments should be picklable, numpy arrays of arguments and results are passed
+        through shared memory (Python 3.8+). initializer(*initargs) is called in each worker
+        (i.e. init_worker_processor, Python 3.7+).
+        """
+        initializer_args = {} if initializer is None else dict(initializer=initializer, initargs=initargs)
+        if processes:
+            self.executor = ProcessPoolExecutor(max_workers, multiprocessing.get_context('spawn'),
+                                                **initializer_args)
+        else:
+            self.executor = ThreadPoolExecutor(max_workers, **initializer_args)
+        self.processes = processes
         self.loop = loop or asyncio.get_event_loop()
 
     def __del__(self):
@@ -25,9 +132,28 @@ class AsyncExecutor:
 
     @asyncio.coroutine
     def map(self, fn, *args, **kwargs):
+        if self.processes:
+            return (yield from self._map_in_process(fn, *args, **kwargs))
         result = yield from self.loop.run_in_executor(self.executor, functools.partial(fn, *args, **kwargs))
         return result
 
+    @asyncio.coroutine
+    def _map_in_process(self, fn, *args, **kwargs):
+        args = [SharedArray.copy_of(value) if _is_shareable(value) else value for value in args]
+        kwargs = {key: SharedArray.copy_of(value) if _is_shareable(value) else value
+                  for key, value in kwargs.items()}
+        # Arguments are unlinked when the worker is done with them, even if this coroutine is cancelled
+        shared = [value for value in list(args) + list(kwargs.values()) if isinstance(value, SharedArray)]
+        future = self.executor.submit(_call_with_shared_arrays, fn, args, kwargs)
+        future.add_done_callback(functools.partial(_release_arrays, shared))
+        try:
+            result = yield from asyncio.wrap_future(future, loop=self.loop)
+        except asyncio.CancelledError:
+            # Task can not be cancelled if the worker already runs it, then its results are unlinked when it is done
+            future.add_done_callback(_discard_results)
+            raise
+        return _receive_results(result)
+
     def shutdown(self, wait=True):
         if self.executor is None:
             return False
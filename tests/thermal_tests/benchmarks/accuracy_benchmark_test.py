@@ -0,0 +1,47 @@
+#
+# Copyright (c) 2015, Nikolay Polyarnyi
+# All rights reserved.
+#
+
+import unittest
+
+from thermal.benchmarks import accuracy as benchmark
+from thermal.simulation.processor import SimulationProcessor
+
+
+class AccuracyBenchmarkTest(unittest.TestCase):
+
+    def test_convergence_and_frontier(self):
+        method_names = ['explicit_central@py', 'implicit_central@py', 'implicit_counter_flow@py',
+                        'explicit_leapfrog@py']
+        results, orders = benchmark.run_benchmark(method_names, levels=3)
+        self.assertEqual(len(results), len(method_names) * 3)
+
+        # Central differences are of the second order in dx (dt ~ dx^2), upwind ones - of the first
+        self.assertGreater(orders['explicit_central@py'], 1.8)
+        self.assertGreater(orders['implicit_central@py'], 1.6)
+        self.assertLess(orders['implicit_counter_flow@py'], 1.2)
+        # Leapfrog is unstable with diffusion
+        self.assertIsNone(orders['explicit_leapfrog@py'])
+
+        frontier = benchmark.pareto_frontier(results, cost='cells_steps')
+        self.assertGreater(len(frontier), 0)
+        for cheaper, better in zip(frontier, frontier[1:]):
+            self.assertLessEqual(cheaper['cells_steps'], better['cells_steps'])
+            self.assertGreater(cheaper['error_l2'], better['error_l2'])
+        for result in results:
+            if result['stable']:
+                self.assertFalse(any(other['cells_steps'] < result['cells_steps'] and
+                                     other['error_l2'] < result['error_l2'] for other in results) and
+                                 result in frontier)
+
+        target = frontier[-1]['error_l2']
+        self.assertIs(benchmark.cheapest(results, target, cost='cells_steps'), frontier[-1])
+        self.assertIsNone(benchmark.cheapest(results, target / 2, cost='cells_steps'))
+
+    def test_errors_are_not_unstable(self):
+        processor = SimulationProcessor(precision='fp64', stability_mode='reject')
+        result = benchmark.measure(processor, 'explicit_central@py', benchmark.DEFAULT_PROBLEM, 50, 1.0)
+        self.assertFalse(result['stable'])
+        with self.assertRaises(KeyError):
+            benchmark.measure(processor, 'unknown_method@py', benchmark.DEFAULT_PROBLEM, 50, 0.05)
@@ -0,0 +1,23 @@
+#
+# Copyright (c) 2015, Nikolay Polyarnyi
+# All rights reserved.
+#
+
+import unittest
+
+from thermal.benchmarks import processor as benchmark
+
+
+class ProcessorBenchmarkTest(unittest.TestCase):
+
+    def test_run_and_compare(self):
+        results = benchmark.run_benchmark(['explicit_central@py', 'implicit_central@py'],
+                                          sizes=[100, 1000], iters_list=[1, 3], repeats=1)
+        self.assertEqual(len(results), 2 * 2 * 2)
+        for result in results:
+            for key in ['compile_s', 'upload_s', 'compute_s', 'download_s', 'cells_steps_per_s', 'gb_per_s']:
+                self.assertGreaterEqual(result[key], 0, msg=key)
+
+        self.assertEqual(benchmark.compare_with_baseline(results, results), [])
+        slower = [dict(result, cells_steps_per_s=result['cells_steps_per_s'] / 2) for result in results]
+        self.assertEqual(len(benchmark.compare_with_baseline(slower, results)), len(results))
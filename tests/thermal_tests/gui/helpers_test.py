@@ -0,0 +1,53 @@
+#
+# Copyright (c) 2015, Nikolay Polyarnyi
+# All rights reserved.
+#
+
+import asyncio
+import unittest
+
+from thermal_tests import test_support
+from thermal.gui.helpers import FramesQueue
+
+
+class FramesQueueTest(unittest.TestCase):
+
+    @test_support.run_until_complete
+    def test_newest_frame(self):
+        frames = FramesQueue(maxsize=3, drop='oldest')
+        for i in range(5):
+            yield from frames.put(i)
+        self.assertEqual(len(frames), 3)
+        self.assertEqual((yield from frames.get_latest()), 4)
+        self.assertEqual(len(frames), 0)
+        self.assertEqual(frames.dropped, 4)
+
+    @test_support.run_until_complete
+    def test_producer_waits(self):
+        frames = FramesQueue(maxsize=2, drop='wait')
+        produced = []
+
+        @asyncio.coroutine
+        def produce():
+            for i in range(10):
+                yield from frames.put(i)
+                produced.append(i)
+        producer = asyncio.ensure_future(produce())
+        yield from asyncio.sleep(0.01)
+        self.assertEqual(produced, [0, 1])
+
+        consumed = []
+        while len(consumed) == 0 or consumed[-1] != 9:
+            consumed.append((yield from frames.get_latest()))
+        yield from producer
+        self.assertEqual(consumed, sorted(consumed))
+        self.assertEqual(frames.dropped + len(consumed), 10)
+
+    @test_support.run_until_complete
+    def test_producer_failure(self):
+        frames = FramesQueue()
+        consumer = asyncio.ensure_future(frames.get_latest())
+        yield from asyncio.sleep(0.01)
+        frames.fail(ValueError())
+        with self.assertRaises(Exception):
+            yield from consumer
@@ -0,0 +1,42 @@
+#
+# Copyright (c) 2015, Nikolay Polyarnyi
+# All rights reserved.
+#
+
+import sys
+import json
+import unittest
+import subprocess
+
+# Seconds to import headless modules, numpy is imported beforehand and not counted
+IMPORT_TIME_BUDGET = 0.25
+
+# Modules that should be imported only when backend or resource is actually used
+LAZY_MODULES = ['pyopencl', 'scipy', 'pkg_resources', 'tkinter', 'cyglfw3', 'OpenGL']
+
+_IMPORT_CODE = '''
+import sys
+import json
+import time
+import numpy
+start = time.time()
+import thermal.run
+import thermal.simulation.processor
+import thermal.simulation.snapshots
+passed = time.time() - start
+print(json.dumps(dict(time=passed, modules=[name for name in {lazy_modules!r} if name in sys.modules])))
+'''
+
+
+class ImportTest(unittest.TestCase):
+
+    def _measure_import(self):
+        code = _IMPORT_CODE.format(lazy_modules=LAZY_MODULES)
+        output = subprocess.check_output([sys.executable, '-c', code], universal_newlines=True)
+        return json.loads(output.strip().splitlines()[-1])
+
+    def test_import_budget(self):
+        # The best of several runs, so that a busy machine does not fail the test
+        results = [self._measure_import() for i in range(3)]
+        self.assertEqual(results[0]['modules'], [])
+        self.assertLess(min(result['time'] for result in results), IMPORT_TIME_BUDGET)
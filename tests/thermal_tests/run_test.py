@@ -0,0 +1,63 @@
+#
+# Copyright (c) 2015, Nikolay Polyarnyi
+# All rights reserved.
+#
+
+import sys
+import json
+import tempfile
+import unittest
+import subprocess
+import numpy as np
+from pathlib import Path
+
+from thermal import run
+from thermal.simulation import checkpoints
+from thermal.simulation.processor import SimulationProcessor
+from thermal.simulation.snapshots import SnapshotReader
+
+
+class RunTest(unittest.TestCase):
+
+    def test_no_gui_imports(self):
+        code = 'import sys, thermal.run; print(sorted(m for m in ["tkinter", "cyglfw3", "OpenGL"] if m in sys.modules))'
+        output = subprocess.check_output([sys.executable, '-c', code], universal_newlines=True)
+        self.assertEqual(output.strip(), '[]')
+
+    def test_run(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            config_path = Path(tmp_dir) / 'config.json'
+            with open(str(config_path), 'w') as f:
+                json.dump(dict(n=239, steps=20, method='explicit_central'), f)
+            output, snapshots = Path(tmp_dir) / 'ts.npy', Path(tmp_dir) / 'snapshots.raw'
+            run.main(['--config', str(config_path), '--steps', '30', '--initial-function', 'step_function',
+                      '--output', str(output), '--snapshots', str(snapshots), '--snapshot-every', '10'])
+
+            ts = run.initial_generators.step_function(239, 239 // 2)
+            params = {key: run.DEFAULT_CONFIG[key] for key in ['dx', 'dt', 'u', 'chi', 'iters']}
+            with SimulationProcessor().open_session(ts, method_name='explicit_central', **params) as session:
+                expected = session.step(30).get()
+            self.assertTrue(np.allclose(np.load(str(output)), expected))
+
+            reader = SnapshotReader(snapshots)
+            self.assertEqual(reader.steps, [0, 10, 20, 30])
+            self.assertTrue(np.allclose(reader[-1], expected))
+
+    def test_resume(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            checkpoint, output = Path(tmp_dir) / 'checkpoint', Path(tmp_dir) / 'ts.npy'
+            args = ['--method', 'explicit_leapfrog', '--chi', '0', '--checkpoint', str(checkpoint),
+                    '--checkpoint-every', '10', '--output', str(output)]
+            run.main(args + ['--steps', '40'])
+            expected = np.load(str(output))
+
+            # Run stopped after 25 steps is continued up to 40 steps in total
+            run.main(args + ['--steps', '25'])
+            run.main(['--resume', str(checkpoint), '--steps', '40', '--output', str(output)])
+            self.assertTrue(np.array_equal(np.load(str(output)), expected))
+
+            # Checkpoint is after 25 steps, so run of 25 steps is complete and shorter run can not be resumed
+            run.main(['--resume', str(checkpoint), '--steps', '25', '--output', str(output)])
+            self.assertTrue(np.array_equal(np.load(str(output)), checkpoints.read_checkpoint(checkpoint)[1][-1]))
+            with self.assertRaises(Exception):
+                run.main(['--resume', str(checkpoint), '--steps', '20'])
@@ -0,0 +1,83 @@
+#
+# Copyright (c) 2015, Nikolay Polyarnyi
+# All rights reserved.
+#
+
+import os
+import time
+import tempfile
+import unittest
+import numpy as np
+
+from thermal.simulation.processor import SimulationProcessor
+from thermal.simulation.cache import ResultCache, CachedProcessor
+
+
+class RecordingProcessor(SimulationProcessor):
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.opened = []
+
+    def open_session(self, ts, **params):
+        self.opened.append(np.array(ts))
+        return super().open_session(ts, **params)
+
+
+class ResultCacheTest(unittest.TestCase):
+
+    def test_prefix(self):
+        np.random.seed(239)
+        ts = np.random.rand(2391)
+        for method_name in ['explicit_central@cl', 'implicit_central@py', 'explicit_leapfrog@py']:
+            params = dict(dx=1.0, dt=1.0, u=0.1, chi=0.2 if 'leapfrog' not in method_name else 0.0, iters=2,
+                          method_name=method_name)
+            with SimulationProcessor().open_session(ts, **params) as session:
+                expected = [session.step(10).get(), session.step(7).get()]
+
+            processor = CachedProcessor(RecordingProcessor(), checkpoint_every=5)
+            key = processor.get_key(ts, **params)
+            self.assertTrue(np.allclose(processor.process(ts, steps=10, **params), expected[0]))
+            self.assertEqual(processor.cache.get_steps(key), [5, 10])
+            self.assertTrue(np.allclose(processor.process(ts, steps=10, **params), expected[0]))
+            self.assertEqual(len(processor.processor.opened), 1)
+
+            # Longer run continues from the longest cached prefix
+            self.assertTrue(np.allclose(processor.process(ts, steps=17, **params), expected[1], atol=1e-6),
+                            msg="For {} method!".format(method_name))
+            self.assertEqual(processor.cache.get_steps(key), [5, 10, 15, 17])
+            if 'leapfrog' not in method_name:
+                self.assertTrue(np.array_equal(processor.processor.opened[-1], expected[0]))
+            else:
+                self.assertTrue(np.array_equal(processor.processor.opened[-1], ts))
+
+            self.assertNotEqual(key, processor.get_key(ts, **dict(params, u=0.2)))
+            self.assertNotEqual(key, CachedProcessor(SimulationProcessor(precision='fp64')).get_key(ts, **params))
+
+    def test_same_as_processor(self):
+        np.random.seed(239)
+        ts = np.random.rand(2391)
+        processor = SimulationProcessor()
+        for method_name in ['explicit_central@py', 'explicit_central@cl', 'implicit_central@py']:
+            params = dict(dx=1.0, dt=1.0, u=0.1, chi=0.2, iters=10, method_name=method_name)
+            cached_processor = CachedProcessor(processor)
+            for i in range(2):
+                self.assertTrue(np.array_equal(cached_processor.process(ts, **params), processor.process(ts, **params)),
+                                msg="For {} method!".format(method_name))
+
+    def test_disk(self):
+        ts = np.zeros(1000)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            cache = ResultCache(memory_items=1, disk_dir=tmp_dir, disk_max_bytes=2 * ts.nbytes + 256)
+            for steps in range(1, 4):
+                cache.put('key', steps, ts + steps)
+                path = os.path.join(tmp_dir, 'key.{}.npy'.format(steps))
+                os.utime(path, (time.time() - 100 + steps, time.time() - 100 + steps))
+            # The least recently used state is evicted
+            self.assertEqual(cache.get_steps('key'), [2, 3])
+
+            cache = ResultCache(disk_dir=tmp_dir)
+            steps, cached = cache.find_longest('key', max_steps=2)
+            self.assertEqual(steps, 2)
+            self.assertTrue(np.array_equal(cached, ts + 2))
+            self.assertIsNone(cache.get('other', 2))
@@ -0,0 +1,46 @@
+#
+# Copyright (c) 2015, Nikolay Polyarnyi
+# All rights reserved.
+#
+
+import tempfile
+import unittest
+import numpy as np
+from pathlib import Path
+
+from thermal.simulation import checkpoints
+from thermal.simulation.processor import SimulationProcessor, GridProcessor
+
+
+class CheckpointsTest(unittest.TestCase):
+
+    def test_resume(self):
+        np.random.seed(239)
+        ts = np.random.rand(2391)
+        params = dict(dx=1.0, dt=1.0, u=0.1, chi=0.2, iters=3)
+        runs = [(SimulationProcessor(), ts, dict(params, method_name=method_name))
+                for method_name in ['explicit_leapfrog@py', 'explicit_leapfrog@cl', 'explicit_central@cl',
+                                    'implicit_central@cl', 'implicit_central@py']]
+        runs.append((SimulationProcessor(precision='fp16'), ts, dict(params, method_name='explicit_central@cl')))
+        runs.append((SimulationProcessor(parts=3), ts.reshape(3, -1), dict(params, method_name='explicit_central')))
+        runs.append((GridProcessor(), ts[:2360].reshape(40, 59), dict(params, method_name='explicit_central@cl')))
+        for processor, ts, params in runs:
+            with tempfile.TemporaryDirectory() as tmp_dir:
+                path = Path(tmp_dir) / 'checkpoint'
+                with processor.open_session(ts, **params) as session:
+                    expected = checkpoints.run_with_checkpoints(session, 30, path, processor, every=10).get()
+                with processor.open_session(ts, **params) as session:
+                    checkpoints.run_with_checkpoints(session, 17, path, processor, every=10)
+                    levels = len(session.get_levels())
+
+                metadata, _ = checkpoints.read_checkpoint(path)
+                self.assertEqual((metadata['steps_done'], metadata['levels']), (17, levels))
+                self.assertEqual(levels, 2 if 'leapfrog' in params['method_name'] else 1)
+                with checkpoints.resume(path, processor) as session:
+                    self.assertEqual(session.steps_done, 17)
+                    ts_res = session.step(3).step(10).get()
+                self.assertTrue(np.array_equal(expected, ts_res),
+                                msg="For {} method in {}!".format(params['method_name'], processor.precision))
+
+                with self.assertRaises(Exception):
+                    checkpoints.resume(path, type(processor)(precision='fp64'))
@@ -0,0 +1,106 @@
+#
+# Copyright (c) 2015, Nikolay Polyarnyi
+# All rights reserved.
+#
+
+import unittest
+import numpy as np
+
+from thermal.simulation import initial_generators
+from thermal.simulation.processor import SimulationProcessor, GridProcessor, get_kernel_modules
+
+
+class GridProcessorTest(unittest.TestCase):
+
+    def _create_random_grid(self, shape, seed=239):
+        np.random.seed(seed)
+        # noinspection PyArgumentList
+        return np.random.rand(*shape)
+
+    def test_methods(self):
+        processor = GridProcessor()
+        self.assertEqual(processor.get_method_names(), ['explicit_central', 'implicit_adi'])
+        self.assertEqual(processor.get_backend_names('explicit_central'), ['cl', 'py'])
+        self.assertEqual(processor.get_backend_names('implicit_adi'), ['py'])
+        with self.assertRaises(Exception):
+            GridProcessor(stability_mode='auto')
+
+    def test_kernels_version(self):
+        processor = GridProcessor()
+        self.assertTrue(processor.get_kernels_version('implicit_adi').startswith('py:'))
+        # ADI solves lines with 1-D implicit kernel, so its sources are part of the version
+        names = [module.__name__ for module in get_kernel_modules(processor._get_py_method('implicit_adi'))]
+        self.assertIn('thermal.simulation.kernels.implicit_central', names)
+        self.assertIn('thermal.simulation.kernels._tridiagonal', names)
+
+    def test_backends_match(self):
+        params = dict(dx=1.0, dt=1.0, u=(0.02, 0.05, 0.1), chi=(0.05, 0.1, 0.15), iters=7)
+        for shape in [(37, 53), (13, 17, 19)]:
+            ts = self._create_random_grid(shape)
+            dims = len(shape)
+            grid_params = dict(params, u=params['u'][:dims], chi=params['chi'][:dims])
+            ts_py = GridProcessor().process(ts, method_name='explicit_central@py', **grid_params)
+            for tiled in [False, True]:
+                processor = GridProcessor(tiled=tiled)
+                with processor.open_session(ts, method_name='explicit_central@cl', **grid_params) as session:
+                    ts_cl = session.step(4).step(3).get()
+                self.assertTrue(np.allclose(ts_py, ts_cl, atol=1e-5), msg="For {} grid, tiled={}!".format(shape, tiled))
+
+    def test_reduces_to_1d(self):
+        # Without transfer along y each inner row of grid evolves as 1-D simulation (border rows are constant)
+        n = 239
+        ts = initial_generators.linear_peak_function(n, n // 3)
+        grid = np.tile(ts, (5, 1))
+        params = dict(dx=1.0, dt=1.0, iters=9)
+        for method_name, grid_method_name in [('explicit_central@py', 'explicit_central@py'),
+                                              ('explicit_central@cl', 'explicit_central@cl')]:
+            ts_res = SimulationProcessor().process(ts, u=0.1, chi=0.2, method_name=method_name, **params)
+            grid_res = GridProcessor().process(grid, u=(0.0, 0.1), chi=(0.0, 0.2), method_name=grid_method_name,
+                                               **params)
+            for row in grid_res[1:-1]:
+                self.assertTrue(np.allclose(ts_res, row, atol=1e-5), msg="For {} method!".format(grid_method_name))
+
+        # ADI scheme along one axis is Crank-Nicolson scheme
+        s, r = 0.1, 0.2
+        increment = np.diag(np.full(n, -2 * r)) + np.diag(np.full(n - 1, r - s / 2), 1) + \
+            np.diag(np.full(n - 1, r + s / 2), -1)
+        increment[[0, -1]] = 0
+        ts_res = ts.copy()
+        for i in range(9):
+            ts_res = np.linalg.solve(np.eye(n) - increment / 2, ts_res + increment.dot(ts_res) / 2)
+        grid_res = GridProcessor().process(grid, u=(0.0, 0.1), chi=(0.0, 0.2), method_name='implicit_adi', **params)
+        for row in grid_res[1:-1]:
+            self.assertTrue(np.allclose(ts_res, row, atol=1e-5))
+
+    def test_adi(self):
+        # Implicit scheme is stable for steps at which explicit one diverges, borders stay constant
+        shape = (17, 19, 23)
+        ts = initial_generators.grid_peak_function(shape, (8, 9, 11), peak_value=100)
+        processor = GridProcessor()
+        with processor.open_session(ts, dx=1.0, dt=1.0, u=0.0, chi=2.0, method_name='implicit_adi') as session:
+            ts_res = session.step(10).get()
+        # Second order scheme is not monotone for such steps, but it does not amplify the peak
+        self.assertLess(np.abs(ts_res).max(), 100)
+        self.assertTrue(np.allclose(ts_res[0], 0.0, atol=1e-6) and np.allclose(ts_res[:, :, -1], 0.0, atol=1e-6))
+        self.assertTrue(np.argmax(ts_res) == np.ravel_multi_index((8, 9, 11), shape))
+
+        ts_explicit = processor.process(ts, dx=1.0, dt=1.0, u=0.0, chi=2.0, iters=10,
+                                        method_name='explicit_central')
+        self.assertGreater(np.abs(ts_explicit).max(), 100)
+
+    def test_adi_order(self):
+        # Halving of time step reduces error (against run with much smaller steps) four times
+        n = 41
+        ys, xs = np.mgrid[0:n, 0:n]
+        ts = np.exp(-((xs - 20) ** 2 + (ys - 18) ** 2) / 20.0)
+        processor = GridProcessor(precision='fp64')
+
+        def run(steps, time=8.0):
+            with processor.open_session(ts, dx=1.0, dt=time / steps, u=(0.3, 0.5), chi=(1.0, 0.7),
+                                        method_name='implicit_adi') as session:
+                return session.step(steps).get()
+
+        reference = run(1024)
+        errors = [np.abs(run(steps) - reference).max() for steps in [8, 16, 32]]
+        for error, error_halved in zip(errors[:-1], errors[1:]):
+            self.assertGreater(error / error_halved, 3.5)
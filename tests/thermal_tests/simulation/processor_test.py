@@ -4,7 +4,10 @@
 #
 
 import logging
+import tempfile
 import unittest
+from unittest import mock
+from pathlib import Path
 import numpy as np
 
 from thermal.simulation.processor import SimulationProcessor
@@ -17,7 +20,7 @@ class SimulationProcessorTest(unittest.TestCase):
     def _create_random_array(self, n, seed=239):
         np.random.seed(seed)
         # noinspection PyArgumentList
-        xs = np.random.rand(239239)
+        xs = np.random.rand(n)
         return xs
 
     def test_methods_names(self):
@@ -66,3 +69,123 @@ class SimulationProcessorTest(unittest.TestCase):
             self.assertTrue(np.all(~np.isnan(ts_res)), msg="For {} method!".format(method_name))
             self.assertTrue(np.allclose(ts_res[[0, -1]], ts[[0, -1]]), msg="Borders are not constant in {} method!".format(method_name))
             self.assertTrue(np.all(input_ts == ts), msg="{} method affects input!".format(method_name))
+
+    def test_processor_linear_iters(self):
+        processor = SimulationProcessor()
+        u = 0.3
+        ts = self._create_random_array(239239)
+
+        np_res = ts.copy()
+        for i in range(10):
+            np_res[1:-1] = (u * np_res[:-2] + np_res[1:-1] + u * np_res[2:]) / (u + 1 + u)
+
+        for method_name in ['test_simple_linear_cl', 'test_simple_linear_py']:
+            ts_res = processor.process(ts, dx=1.0, dt=1.0, u=u, chi=1.0,
+                                       method_name=method_name, iters=10)
+            self.assertTrue(np.allclose(np_res, ts_res), msg="For {} method!".format(method_name))
+
+    def test_backends(self):
+        processor = SimulationProcessor()
+        self.assertEqual(processor.get_backend_names('explicit_central'), ['cl', 'py'])
+        self.assertEqual(processor.get_backend_names('test_simple_linear_cl'), ['cl'])
+        self.assertEqual(processor.get_backend_names('implicit_central'), ['cl', 'py'])
+        # Implicit methods use LAPACK solver unless OpenCL one is requested
+        self.assertTrue(processor.get_kernels_version('implicit_central').startswith('py:'))
+        self.assertTrue(processor.get_kernels_version('explicit_central').startswith('cl:'))
+        with self.assertRaises(KeyError):
+            processor.process(np.zeros(239), dx=1.0, dt=1.0, u=0.2, chi=1.0, method_name='test_simple_linear_cl@py')
+
+    def test_unsupported_precision(self):
+        ts = self._create_random_array(239)
+        params = dict(dx=1.0, dt=1.0, u=0.2, chi=0.2)
+        processor = SimulationProcessor(precision='fp64')
+        with mock.patch('thermal.simulation.cl_session.supports_precision', return_value=False):
+            with self.assertRaises(Exception):
+                processor.process(ts, method_name='explicit_central@cl', **params)
+            # Without explicit backend Python kernels are used
+            self.assertEqual(processor.process(ts, method_name='explicit_central', **params).dtype, np.float64)
+            self.assertEqual(processor.get_backend_names('explicit_central'), ['py'])
+
+    def test_py_backends_match_cl(self):
+        processor = SimulationProcessor()
+        ts = np.float32(self._create_random_array(239239))
+        for method_name in ['explicit_by_flow', 'explicit_central', 'explicit_counter_flow', 'explicit_leapfrog',
+                            'implicit_by_flow', 'implicit_central', 'implicit_counter_flow']:
+            params = dict(dx=1.0, dt=1.0, u=0.02, chi=0.1, iters=5)
+            cl_res = processor.process(ts, method_name='{}@cl'.format(method_name), **params)
+            py_res = processor.process(ts, method_name='{}@py'.format(method_name), **params)
+            self.assertTrue(np.allclose(cl_res, py_res, atol=1e-5), msg="For {} method!".format(method_name))
+
+    def test_implicit_factorization_cache(self):
+        from thermal.simulation.kernels import implicit_central
+
+        processor = SimulationProcessor()
+        n, s, r = 239, 0.2, 1.0
+        ts = self._create_random_array(n)
+
+        matrix = np.diag(np.full(n, 1 + 2 * r)) + np.diag(np.full(n - 1, -(r - s / 2)), 1) + \
+            np.diag(np.full(n - 1, -(r + s / 2)), -1)
+        matrix[[0, -1]] = 0
+        matrix[0, 0] = matrix[-1, -1] = 1
+        np_res = ts
+        for i in range(3):
+            np_res = np.linalg.solve(matrix, np_res)
+
+        implicit_central.factorize.cache_clear()
+        for i in range(2):
+            ts_res = processor.process(ts, dx=1.0, dt=1.0, u=0.0, chi=0.0, s=s, r=r,
+                                       method_name='implicit_central@py', iters=3)
+            self.assertTrue(np.allclose(np_res, ts_res))
+        self.assertEqual(implicit_central.factorize.cache_info().misses, 1)
+
+        # With r = -0.5 the only inner row of the matrix is zero
+        with self.assertRaises(Exception):
+            implicit_central.factorize(3, 0.0, -0.5, np.dtype(np.float64))
+
+    def test_lazy_compilation_and_binary_cache(self):
+        with tempfile.TemporaryDirectory() as cache_dir:
+            processor = SimulationProcessor(kernels_cache_dir=cache_dir)
+            with mock.patch('thermal.utils.cl.create_context') as create_context:
+                self.assertIn('explicit_central', processor.get_method_names())
+                self.assertFalse(create_context.called)
+            self.assertEqual(len(list(Path(cache_dir).iterdir())), 0)
+
+            ts = self._create_random_array(239)
+            ts_res = processor.process(ts, dx=1.0, dt=1.0, u=0.2, chi=0.2, method_name='explicit_central@cl')
+            self.assertEqual(len(list(Path(cache_dir).iterdir())), 1)
+
+            cached_processor = SimulationProcessor(kernels_cache_dir=cache_dir)
+            cached_res = cached_processor.process(ts, dx=1.0, dt=1.0, u=0.2, chi=0.2,
+                                                  method_name='explicit_central@cl')
+            self.assertEqual(len(list(Path(cache_dir).iterdir())), 1)
+            self.assertTrue(np.all(ts_res == cached_res))
+
+    def test_stability_modes(self):
+        ts = self._create_random_array(239)
+        # r = 1.2 is unstable for explicit central scheme, 3 sub-steps with r = 0.4 are stable
+        params = dict(dx=1.0, dt=1.0, u=0.1, chi=1.2, iters=4)
+
+        with SimulationProcessor(stability_mode='auto').open_session(ts, method_name='explicit_central',
+                                                                     **params) as session:
+            self.assertEqual(session.substeps, 3)
+            ts_auto = session.step().get()
+        ts_substeps = SimulationProcessor().process(ts, s=0.1 / 3, r=0.4, dx=1.0, dt=1.0, u=0.1, chi=1.2, iters=12,
+                                                    method_name='explicit_central')
+        self.assertTrue(np.allclose(ts_auto, ts_substeps))
+        self.assertTrue(np.abs(ts_auto).max() <= np.abs(ts).max())
+
+        with SimulationProcessor(stability_mode='implicit').open_session(ts, method_name='explicit_central@py',
+                                                                         **params) as session:
+            self.assertEqual((session.method_name, session.substeps), ('implicit_central@py', 1))
+
+        with self.assertRaises(Exception):
+            SimulationProcessor(stability_mode='reject').process(ts, method_name='explicit_central', **params)
+        # Leapfrog scheme with diffusion is unstable with any step
+        with self.assertRaises(Exception):
+            SimulationProcessor(stability_mode='auto').process(ts, method_name='explicit_leapfrog', **params)
+
+        # Stable parameters and methods without known stability limits are not changed
+        for method_name in ['explicit_central', 'test_simple_linear_cl']:
+            with SimulationProcessor(stability_mode='reject').open_session(ts, method_name=method_name,
+                                                                           **dict(params, chi=0.2)) as session:
+                self.assertEqual((session.method_name, session.substeps), (method_name, 1))
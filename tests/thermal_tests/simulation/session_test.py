@@ -0,0 +1,193 @@
+#
+# Copyright (c) 2015, Nikolay Polyarnyi
+# All rights reserved.
+#
+
+import unittest
+import numpy as np
+
+from thermal.simulation.processor import SimulationProcessor, GridProcessor
+from thermal.simulation.cl_session import DecomposedClSession
+
+
+class SimulationSessionTest(unittest.TestCase):
+
+    def _create_random_array(self, n, seed=239):
+        np.random.seed(seed)
+        # noinspection PyArgumentList
+        return np.random.rand(n)
+
+    def test_linear_session(self):
+        processor = SimulationProcessor()
+        u = 0.3
+        ts = self._create_random_array(2391)
+
+        np_res = ts.copy()
+        for i in range(5):
+            np_res[1:-1] = (u * np_res[:-2] + np_res[1:-1] + u * np_res[2:]) / (u + 1 + u)
+
+        for method_name in ['test_simple_linear_cl', 'test_simple_linear_py']:
+            with processor.open_session(ts, dx=1.0, dt=1.0, u=u, chi=1.0, method_name=method_name) as session:
+                session.step(2)
+                session.step(3)
+                self.assertEqual(session.steps_done, 5)
+                self.assertTrue(np.allclose(np_res, session.get()), msg="For {} method!".format(method_name))
+
+    def test_steps_split(self):
+        processor = SimulationProcessor()
+        ts = self._create_random_array(2391)
+        method_names = ['{}@{}'.format(name, backend) for name in processor.get_method_names()
+                        for backend in processor.get_backend_names(name)]
+        for method_name in method_names:
+            params = dict(dx=1.0, dt=1.0, u=0.2, chi=0.2, method_name=method_name)
+            with processor.open_session(ts, **params) as session:
+                ts_once = session.step(6).get()
+            with processor.open_session(ts, **params) as session:
+                for i in range(3):
+                    session.step(2)
+                ts_split = session.get()
+            self.assertTrue(np.allclose(ts_once, ts_split), msg="For {} method!".format(method_name))
+            self.assertTrue(np.allclose(ts_once[[0, -1]], ts[[0, -1]]), msg="For {} method!".format(method_name))
+
+    def test_batch(self):
+        processor = SimulationProcessor()
+        batch, n = 4, 239
+        ts = self._create_random_array(batch * n).reshape(batch, n)
+        us = np.float32([0.05, 0.1, 0.05, 0.0])
+        chis = np.float32([0.1, 0.2, 0.1, 0.3])
+
+        method_names = ['{}@{}'.format(name, backend) for name in processor.get_method_names()
+                        for backend in processor.get_backend_names(name)]
+        for method_name in method_names:
+            ts_res = processor.process(ts, dx=1.0, dt=1.0, u=us, chi=chis, iters=3, method_name=method_name)
+            self.assertEqual(ts_res.shape, (batch, n))
+            for member in range(batch):
+                member_res = processor.process(ts[member], dx=1.0, dt=1.0, u=us[member], chi=chis[member], iters=3,
+                                               method_name=method_name)
+                self.assertTrue(np.allclose(member_res, ts_res[member], atol=1e-5),
+                                msg="For {} method and member #{}!".format(method_name, member))
+
+    def test_temporal_blocking(self):
+        ts = self._create_random_array(23917)
+        params = dict(dx=1.0, dt=1.0, u=0.1, chi=0.2)
+        for method_name in ['explicit_by_flow', 'explicit_central', 'explicit_counter_flow', 'test_simple_linear_cl']:
+            ts_res = SimulationProcessor(block_steps=1).process(ts, iters=37, method_name=method_name, **params)
+            for block_steps in [2, 8, 64]:
+                processor = SimulationProcessor(block_steps=block_steps)
+                with processor.open_session(ts, method_name=method_name, **params) as session:
+                    ts_blocked = session.step(30).step(7).get()
+                self.assertTrue(np.allclose(ts_res, ts_blocked, atol=1e-6),
+                                msg="For {} method with {} steps per block!".format(method_name, block_steps))
+
+    def test_temporal_blocking_fp16(self):
+        # Each fused step is rounded to half precision storage, as between launches of unblocked kernel
+        ts = self._create_random_array(23917)
+        params = dict(dx=1.0, dt=1.0, u=0.1, chi=0.2, iters=37, method_name='explicit_central')
+        ts_res = SimulationProcessor(block_steps=1, precision='fp16').process(ts, **params)
+        for block_steps in [2, 8, 64]:
+            ts_blocked = SimulationProcessor(block_steps=block_steps, precision='fp16').process(ts, **params)
+            self.assertTrue(np.array_equal(ts_res, ts_blocked), msg="For {} steps per block!".format(block_steps))
+
+    def test_domain_decomposition(self):
+        batch, n = 2, 2391
+        ts = self._create_random_array(batch * n).reshape(batch, n)
+        params = dict(dx=1.0, dt=1.0, u=0.1, chi=0.2)
+        for method_name in ['explicit_central', 'explicit_counter_flow', 'test_simple_linear_cl']:
+            ts_res = SimulationProcessor(parts=1).process(ts, iters=37, method_name=method_name, **params)
+            for parts, exchange_steps in [(2, 1), (3, 8), (7, 16)]:
+                processor = SimulationProcessor(parts=parts, exchange_steps=exchange_steps)
+                with processor.open_session(ts, method_name=method_name, **params) as session:
+                    self.assertIsInstance(session, DecomposedClSession)
+                    ts_parts = session.step(30).step(7).get()
+                self.assertTrue(np.allclose(ts_res, ts_parts, atol=1e-6),
+                                msg="For {} method with {} parts!".format(method_name, parts))
+
+    def test_sub_devices_decomposition(self):
+        from thermal.utils.cl import create_context
+
+        context = create_context(sub_devices=2)
+        if len(context.devices) < 2:
+            self.skipTest('OpenCL device can not be split into sub-devices!')
+        ts = self._create_random_array(2391)
+        params = dict(dx=1.0, dt=1.0, u=0.1, chi=0.2, method_name='explicit_central@cl')
+        ts_res = SimulationProcessor(parts=1).process(ts, iters=37, **params)
+        with SimulationProcessor(context, exchange_steps=8).open_session(ts, **params) as session:
+            self.assertIsInstance(session, DecomposedClSession)
+            self.assertEqual(len(set(part._queue.device for part in session._parts)), len(context.devices))
+            ts_parts = session.step(37).get()
+        self.assertTrue(np.allclose(ts_res, ts_parts, atol=1e-6))
+
+    def test_precision(self):
+        batch, n = 3, 239
+        ts = self._create_random_array(batch * n).reshape(batch, n)
+        params = dict(dx=1.0, dt=1.0, u=0.1, chi=0.2, iters=20)
+        processors = {precision: SimulationProcessor(precision=precision) for precision in ['fp32', 'fp64', 'fp16']}
+        # Leapfrog scheme amplifies errors of these parameters, so it is not compared
+        method_names = ['{}@{}'.format(name, backend) for name in processors['fp64'].get_method_names()
+                        for backend in processors['fp64'].get_backend_names(name) if name != 'explicit_leapfrog']
+        for method_name in method_names:
+            name = method_name.split('@')[0]
+            if 'py' in processors['fp64'].get_backend_names(name):
+                reference = processors['fp64'].process(ts, method_name='{}@py'.format(name), **params)
+            else:
+                reference = processors['fp64'].process(ts, method_name=method_name, **params)
+            for precision, dtype, atol in [('fp64', np.float64, 1e-12), ('fp32', np.float32, 1e-5),
+                                           ('fp16', np.float16, 3e-3)]:
+                ts_res = processors[precision].process(ts, method_name=method_name, **params)
+                self.assertEqual(ts_res.dtype, dtype)
+                self.assertTrue(np.allclose(reference, ts_res, atol=atol),
+                                msg="For {} method in {}!".format(method_name, precision))
+
+    def _expected_stats(self, ts, ts_prev, axis):
+        diff = np.float64(ts) - ts_prev
+        return [np.abs(diff).max(axis), np.sqrt(np.mean(diff * diff, axis)), np.sum(np.float64(ts), axis),
+                ts.min(axis), ts.max(axis)]
+
+    def test_stats(self):
+        batch, n = 3, 2391
+        ts = self._create_random_array(batch * n).reshape(batch, n)
+        params = dict(dx=1.0, dt=1.0, u=0.1, chi=0.2)
+        processor = SimulationProcessor()
+        method_names = ['{}@{}'.format(name, backend) for name in processor.get_method_names()
+                        for backend in processor.get_backend_names(name)]
+        sessions = [(method_name, processor.open_session(ts, method_name=method_name, **params))
+                    for method_name in method_names]
+        sessions.append(('explicit_central in parts', SimulationProcessor(parts=3).open_session(
+            ts, method_name='explicit_central@cl', **params)))
+        for backend in ['cl', 'py']:
+            sessions.append(('2-D explicit_central@{}'.format(backend), GridProcessor().open_session(
+                ts, method_name='explicit_central@{}'.format(backend), **params)))
+        for method_name, session in sessions:
+            with session:
+                ts_prev = session.step(2).get()
+                stats = session.step_with_stats()
+                axis = -1 if session.batched else None
+                for value, expected in zip(stats, self._expected_stats(session.get(), ts_prev, axis)):
+                    self.assertTrue(np.allclose(value, expected, rtol=1e-4, atol=1e-6),
+                                    msg="For {} method!".format(method_name))
+                ts_cur = session.step().get()
+                for value, expected in zip(session.get_stats(), self._expected_stats(ts_cur, ts_cur, axis)):
+                    self.assertTrue(np.allclose(value, expected, rtol=1e-4, atol=1e-6),
+                                    msg="For {} method!".format(method_name))
+
+    def test_convergence(self):
+        # With constant borders diffusion converges to linear profile
+        n = 31
+        ts = self._create_random_array(n)
+        ts[0], ts[-1] = 0.0, 1.0
+        for method_name in ['explicit_central@cl', 'explicit_central@py', 'implicit_central@cl']:
+            ts_res, steps, stats = SimulationProcessor().process_until_converged(
+                ts, dx=1.0, dt=1.0, u=0.0, chi=0.4, tolerance=1e-6, max_steps=100000, check_every=50,
+                method_name=method_name)
+            self.assertTrue(stats.residual_max < 1e-6 and steps < 100000, msg="For {} method!".format(method_name))
+            self.assertEqual(steps % 50, 0)
+            self.assertTrue(np.allclose(ts_res, np.linspace(0, 1, n), atol=1e-3),
+                            msg="For {} method!".format(method_name))
+            self.assertAlmostEqual(stats.min, 0.0)
+            self.assertAlmostEqual(stats.max, 1.0)
+
+        with SimulationProcessor().open_session(ts, dx=1.0, dt=1.0, u=0.0, chi=0.4,
+                                                method_name='explicit_central') as session:
+            session.run_until_converged(1e-6, max_steps=30, check_every=16)
+            self.assertFalse(session.converged)
+            self.assertEqual(session.steps_done, 30)
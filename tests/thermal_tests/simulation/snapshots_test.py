@@ -0,0 +1,37 @@
+#
+# Copyright (c) 2015, Nikolay Polyarnyi
+# All rights reserved.
+#
+
+import tempfile
+import unittest
+import numpy as np
+from pathlib import Path
+
+from thermal.simulation.processor import SimulationProcessor
+from thermal.simulation.snapshots import SnapshotWriter, SnapshotReader
+
+
+class SnapshotsTest(unittest.TestCase):
+
+    def test_session_snapshots(self):
+        processor = SimulationProcessor()
+        np.random.seed(239)
+        ts = np.random.rand(2391)
+        params = dict(dx=1.0, dt=1.0, u=0.1, chi=0.2, method_name='explicit_central')
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = Path(tmp_dir) / 'snapshots.raw'
+            with processor.open_session(ts, **params) as session:
+                with SnapshotWriter(path, every=5, space_step=3, chunk_steps=4) as writer:
+                    session.run(23, writer)
+                    session.run(7, writer)
+
+            reader = SnapshotReader(path)
+            self.assertEqual(len(reader), 7)
+            self.assertEqual(reader.steps, [0, 5, 10, 15, 20, 25, 30])
+            self.assertEqual(reader[:].shape, (7, len(ts[::3])))
+            self.assertTrue(np.allclose(reader[0], ts[::3]))
+            for i in [3, 6]:
+                expected = processor.process(ts, iters=reader.steps[i], **params)
+                self.assertTrue(np.allclose(reader[i], expected[::3]))
@@ -0,0 +1,76 @@
+#
+# Copyright (c) 2015, Nikolay Polyarnyi
+# All rights reserved.
+#
+
+import json
+import tempfile
+import unittest
+import numpy as np
+from pathlib import Path
+
+from thermal import sweep
+from thermal.simulation import initial_generators
+from thermal.simulation.processor import SimulationProcessor
+
+
+class SweepTest(unittest.TestCase):
+
+    def test_sweep(self):
+        grid = dict(method=['explicit_central', 'implicit_central@py'], n=239, steps=7, iters=3,
+                    u=[0.0, 0.05, 0.1], chi=[0.001, 0.002])
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            spec_path, results_path = Path(tmp_dir) / 'spec.json', Path(tmp_dir) / 'results.npz'
+            with open(str(spec_path), 'w') as f:
+                json.dump(grid, f)
+
+            # Interrupted sweep is resumed: runs already in results file are skipped
+            sweep.sweep(dict(grid, method='explicit_central'), results_path, batch_size=4)
+            logs = []
+            sweep.main([str(spec_path), str(results_path), '--batch-size', '4'])
+            results = sweep.sweep(grid, results_path, log=logs.append)
+            self.assertEqual(logs, ['0 runs to do, 12 done before'])
+
+            columns = sweep.SweepResults(results_path).get_columns()
+            self.assertEqual(sorted(columns.keys()), sorted(sweep.COLUMNS))
+            self.assertEqual(len(set(columns['key'])), 12)
+            self.assertEqual(sorted(set(columns['batch'])), [2, 4])
+
+            processor = SimulationProcessor()
+            ts = initial_generators.linear_peak_function(239, 239 // 2)
+            for i in range(len(results)):
+                params = {name: columns[name][i] for name in ['dx', 'dt', 'u', 'chi']}
+                with processor.open_session(ts, method_name=str(columns['method'][i]), iters=3, **params) as session:
+                    ts_res = session.step(7).get()
+                self.assertTrue(np.allclose(ts_res.max(), columns['max'][i]))
+                self.assertTrue(np.allclose(ts_res.sum(), columns['total'][i], rtol=1e-4))
+
+            # Hashes of states are reproducible
+            sweep.sweep(grid, Path(tmp_dir) / 'again.npz', batch_size=4)
+            again = sweep.SweepResults(Path(tmp_dir) / 'again.npz').get_columns()
+            self.assertEqual(dict(zip(columns['key'], columns['state_hash'])),
+                             dict(zip(again['key'], again['state_hash'])))
+
+    def test_stability_modes(self):
+        # r = 1.2 is unstable for explicit central scheme, so it is not batched with stable runs
+        runs = [dict(method='explicit_central', n=239, steps=5, dx=1.0, dt=1.0, u=0.1, chi=chi)
+                for chi in [0.1, 1.2, 0.2]]
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            auto = dict(stability_mode='auto')
+            columns = sweep.sweep(runs, Path(tmp_dir) / 'auto.npz', processor_params=auto).get_columns()
+            alone = sweep.sweep(runs[:1], Path(tmp_dir) / 'alone.npz', processor_params=auto).get_columns()
+            hashes = dict(zip(columns['key'], columns['state_hash']))
+            self.assertEqual(hashes[alone['key'][0]], alone['state_hash'][0])
+            self.assertEqual(sorted(columns['batch']), [1, 2, 2])
+            self.assertEqual(list(columns['error']), ['', '', ''])
+
+            # Rejected run is recorded as failed, the others are done
+            logs = []
+            results = sweep.sweep(runs, Path(tmp_dir) / 'reject.npz', processor_params=dict(stability_mode='reject'),
+                                  log=logs.append)
+            columns = results.get_columns()
+            self.assertEqual(len(results), 3)
+            failed = [i for i in range(3) if columns['error'][i] != '']
+            self.assertEqual([columns['chi'][i] for i in failed], [1.2])
+            self.assertEqual(columns['state_hash'][failed[0]], '')
+            self.assertIn('1 runs rejected by stability mode reject', logs)
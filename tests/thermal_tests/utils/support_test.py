@@ -0,0 +1,64 @@
+#
+# Copyright (c) 2015, Nikolay Polyarnyi
+# All rights reserved.
+#
+
+import os
+import time
+import asyncio
+import unittest
+import numpy as np
+
+from thermal_tests import test_support
+from thermal.utils.support import AsyncExecutor
+from thermal.simulation.processor import SimulationProcessor, init_worker_processor, process_in_worker
+
+
+def _slow_zeros(n, seconds):
+    time.sleep(seconds)
+    return np.zeros(n)
+
+
+def _list_shared_memory():
+    return set(os.listdir('/dev/shm')) if os.path.isdir('/dev/shm') else None
+
+
+class AsyncExecutorTest(unittest.TestCase):
+
+    @test_support.run_until_complete
+    def test_processes(self):
+        np.random.seed(239)
+        tss = [np.random.rand(2391) for i in range(4)]
+        params = dict(dx=1.0, dt=1.0, u=0.1, chi=0.2, iters=5, method_name='implicit_central@py')
+        executor = AsyncExecutor(2, processes=True, initializer=init_worker_processor,
+                                 initargs=(dict(precision='fp64'), ['implicit_central@py']))
+        try:
+            results = yield from asyncio.gather(*[executor.map(process_in_worker, ts, dict(precision='fp64'),
+                                                               **params) for ts in tss])
+            pids = yield from asyncio.gather(*[executor.map(os.getpid) for i in range(4)])
+        finally:
+            executor.shutdown()
+
+        processor = SimulationProcessor(precision='fp64')
+        for ts, ts_res in zip(tss, results):
+            self.assertTrue(np.allclose(processor.process(ts, **params), ts_res))
+        self.assertNotIn(os.getpid(), pids)
+
+    @test_support.run_until_complete
+    def test_processes_cancelled(self):
+        before = _list_shared_memory()
+        if before is None:
+            self.skipTest('Shared memory blocks can not be listed!')
+        executor = AsyncExecutor(1, processes=True)
+        try:
+            # The first task is run by the worker when it is cancelled, the second one is cancelled before it starts
+            tasks = [asyncio.ensure_future(executor.map(_slow_zeros, 2391, 1.0)) for i in range(2)]
+            yield from asyncio.sleep(0.5)
+            for task in tasks:
+                task.cancel()
+            for task in tasks:
+                with self.assertRaises(asyncio.CancelledError):
+                    yield from task
+        finally:
+            executor.shutdown()
+        self.assertEqual(_list_shared_memory(), before)